@@ -2,9 +2,13 @@
 Main Application Entry Point - Multi-page SaaS Trading Platform
 """
 import streamlit as st
+import plotly.io as pio
 from database import DatabaseManager
 from datetime import datetime, timedelta
 
+# Serialize figures for st.plotly_chart with orjson instead of the stdlib json encoder
+pio.json.config.default_engine = "orjson"
+
 # Import all pages at module level
 import pages.dashboard as dashboard
 import pages.stock_details as stock_details
@@ -20,9 +24,16 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+
+@st.cache_resource
+def get_database():
+    """One DatabaseManager (connections, trade writer thread, caches) for every browser session"""
+    return DatabaseManager()
+
+
 # Initialize database
 if 'db' not in st.session_state:
-    st.session_state.db = DatabaseManager()
+    st.session_state.db = get_database()
 
 # Initialize session state
 if 'logged_in' not in st.session_state:
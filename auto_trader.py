@@ -24,11 +24,11 @@ class AutoTrader:
         self.api = REST(self.api_key, self.api_secret, "https://paper-api.alpaca.markets")
         
         # Load user settings
-        self.min_confidence = int(db.get_setting(user_id, 'auto_trade_min_confidence') or 70)
-        self.max_position_pct = int(db.get_setting(user_id, 'auto_trade_max_position_pct') or 10)
-        self.max_daily_trades = int(db.get_setting(user_id, 'auto_trade_max_daily_trades') or 20)
-        self.max_daily_buys = int(db.get_setting(user_id, 'auto_trade_max_daily_buys') or 10)
-        self.max_daily_sells = int(db.get_setting(user_id, 'auto_trade_max_daily_sells') or 10)
+        self.min_confidence = int(db.get_setting_float(user_id, 'auto_trade_min_confidence', 70))
+        self.max_position_pct = int(db.get_setting_float(user_id, 'auto_trade_max_position_pct', 10))
+        self.max_daily_trades = int(db.get_setting_float(user_id, 'auto_trade_max_daily_trades', 20))
+        self.max_daily_buys = int(db.get_setting_float(user_id, 'auto_trade_max_daily_buys', 10))
+        self.max_daily_sells = int(db.get_setting_float(user_id, 'auto_trade_max_daily_sells', 10))
     
     def get_today_trade_count(self) -> dict:
         """Get count of trades executed today"""
@@ -77,8 +77,7 @@ class AutoTrader:
             return
         
         # Get auto-trade enabled stocks
-        watchlist = self.db.get_user_watchlist(self.user_id)
-        auto_trade_stocks = [item for item in watchlist if item['auto_trade_enabled']]
+        auto_trade_stocks = self.db.get_auto_trade_symbols(self.user_id)
         
         if not auto_trade_stocks:
             logger.info("No stocks enabled for auto-trading")
@@ -86,8 +85,7 @@ class AutoTrader:
         
         logger.info(f"🔍 Checking {len(auto_trade_stocks)} stocks for trading signals...")
         
-        for item in auto_trade_stocks:
-            symbol = item['symbol']
+        for symbol in auto_trade_stocks:
             try:
                 self.process_stock(symbol)
             except Exception as e:
@@ -282,7 +280,8 @@ class AutoTrader:
                 quantity=quantity,
                 price=current_price,
                 order_id=order.id,
-                notes=f"Auto-trade: {analysis['signal']} ({analysis['confidence']}% confidence) | Score: {int(position_pct * 10)}/10"
+                notes=f"Auto-trade: {analysis['signal']} ({analysis['confidence']}% confidence) | Score: {int(position_pct * 10)}/10",
+                wait=False  # batched by the DB writer thread; nothing here needs the trade_id
             )
             
             logger.info(f"✅ {symbol}: Buy order submitted (Order ID: {order.id})")
@@ -319,7 +318,8 @@ class AutoTrader:
                 quantity=quantity,
                 price=price,
                 order_id=order.id,
-                notes=f"Auto-trade: SELL signal - {reason}"
+                notes=f"Auto-trade: SELL signal - {reason}",
+                wait=False
             )
             
             logger.info(f"✅ {symbol}: Sell order submitted (Order ID: {order.id})")
@@ -1,16 +1,63 @@
 import os
+import html
+import math
+import json
+import pickle
+import hashlib
+import functools
+import inspect
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date
+from typing import List, Optional
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from alpaca_trade_api.rest import REST, TimeFrame
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
+import numpy as np
+import ahocorasick
+from numba import njit
 import time
-import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.subplots import make_subplots
 import yfinance as yf
+import yfinance_cache as yfc
 from investment_finder import InvestmentFinderSystem
 
+# Serialize figures for st.plotly_chart with orjson instead of the stdlib json encoder
+pio.json.config.default_engine = "orjson"
+
+# Max concurrent per-symbol Yahoo/Alpaca fetches (kept small to stay under Yahoo rate limits)
+MAX_FETCH_WORKERS = 8
+
+# On-disk (L2) cache under st.cache_data so restarts and new sessions don't re-hit Yahoo/Alpaca.
+# TTLs in seconds, per endpoint; minute bars drive auto-trade signals so they don't outlive the L1 TTL.
+DISK_CACHE_DIR = ".cache"
+DISK_CACHE_TTLS = {
+    "get_trend_data_Day": 24 * 60 * 60,
+    "get_trend_data_Minute": 10 * 60,
+    "get_yahoo_analysis": 24 * 60 * 60,
+    "get_news_signal": 60 * 60,
+}
+# Entries that also expire when the US market date changes, so a daily bar saved while the session
+# was still open isn't served as final the next day
+DISK_CACHE_DAILY = {"get_trend_data_Day"}
+MARKET_TZ = "America/New_York"
+
 # Simple keyword-based sentiment dictionaries for news headlines
 POS_WORDS = {"beat", "surge", "rise", "record", "profit", "gain", "upgrade", "outperform", "strong", "growth", "tops"}
 NEG_WORDS = {"miss", "fall", "drop", "loss", "cut", "downgrade", "lawsuit", "probe", "weak", "slump", "fraud"}
+# Both lexicons in one Aho-Corasick automaton (value = (keyword, +1/-1)) so a headline is scanned once
+SENTIMENT_AUTOMATON = ahocorasick.Automaton()
+for _word in POS_WORDS:
+    SENTIMENT_AUTOMATON.add_word(_word, (_word, 1))
+for _word in NEG_WORDS:
+    SENTIMENT_AUTOMATON.add_word(_word, (_word, -1))
+SENTIMENT_AUTOMATON.make_automaton()
 
 # ------------------------------
 # Alpaca API credentials
@@ -18,14 +65,127 @@ NEG_WORDS = {"miss", "fall", "drop", "loss", "cut", "downgrade", "lawsuit", "pro
 API_KEY = os.getenv("APCA_API_KEY_ID", "")
 API_SECRET = os.getenv("APCA_API_SECRET_KEY", "")
 BASE_URL = os.getenv("APCA_API_BASE_URL", "https://paper-api.alpaca.markets/")
-api = REST(API_KEY, API_SECRET, BASE_URL) if API_KEY and API_SECRET else None
+# Shared by MAX_FETCH_WORKERS threads and every browser session on this server
+ALPACA_POOL_SIZE = 32
+
+
+@st.cache_resource
+def get_alpaca_client(api_key, api_secret, base_url):
+    """Builds the Alpaca REST client once per server process (not on every rerun) so its
+    keep-alive connection pool is reused instead of re-doing TLS handshakes."""
+    client = REST(api_key, api_secret, base_url)
+    # urllib3 retries only idempotent requests by default, so orders are never resubmitted here
+    adapter = HTTPAdapter(
+        pool_connections=ALPACA_POOL_SIZE,
+        pool_maxsize=ALPACA_POOL_SIZE,
+        max_retries=Retry(total=3, backoff_factor=0.3),
+    )
+    client._session.mount("https://", adapter)
+    client._session.headers["Connection"] = "keep-alive"
+    return client
+
+
+api = get_alpaca_client(API_KEY, API_SECRET, BASE_URL) if API_KEY and API_SECRET else None
+
+
+def market_date(timestamp):
+    """US market calendar date of a Unix timestamp."""
+    return pd.Timestamp(timestamp, unit="s", tz="UTC").tz_convert(MARKET_TZ).date()
+
+
+def disk_cache(category=None, cache_if=lambda result: result is not None):
+    """Persists a function's return value as a pickle under DISK_CACHE_DIR/<fn name>/<md5 of args>.pkl.
+
+    category(arguments) picks the DISK_CACHE_TTLS entry (defaults to the function name); entries older
+    than that TTL by mtime, or (for DISK_CACHE_DAILY categories) written on an earlier market date, are
+    refetched. Results rejected by cache_if (errors/placeholders/fallbacks) aren't stored.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+        cache_dir = os.path.join(DISK_CACHE_DIR, fn.__name__)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            name = category(arguments) if category else fn.__name__
+            ttl = DISK_CACHE_TTLS[name]
+            key = hashlib.md5(
+                json.dumps(arguments, sort_keys=True, default=lambda v: getattr(v, "value", str(v))).encode()
+            ).hexdigest()
+            path = os.path.join(cache_dir, f"{key}.pkl")
+
+            try:
+                mtime = os.path.getmtime(path)
+                now = time.time()
+                if now - mtime < ttl and (name not in DISK_CACHE_DAILY or market_date(mtime) == market_date(now)):
+                    with open(path, "rb") as f:
+                        return pickle.load(f)
+            except (OSError, pickle.PickleError, EOFError):
+                pass
+
+            result = fn(*args, **kwargs)
+            if cache_if(result):
+                try:
+                    os.makedirs(cache_dir, exist_ok=True)
+                    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                    with open(tmp_path, "wb") as f:
+                        pickle.dump(result, f)
+                    os.replace(tmp_path, path)
+                except OSError as e:
+                    print(f"Disk cache write failed for {fn.__name__}: {e}")
+            return result
+        return wrapper
+    return decorator
+
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def coalesce(fn):
+    """Collapses concurrent identical calls into one: the first caller runs fn, the rest wait on its Future.
+
+    Keyed by function name + bound arguments, so parallel fetches of the same symbol issue a
+    single upstream request; the entry is dropped as soon as the call finishes.
+    """
+    signature = inspect.signature(fn)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = (fn.__name__, tuple(bound.arguments.items()))
+
+        with _inflight_lock:
+            future = _inflight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                _inflight[key] = future
+        if not is_owner:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with _inflight_lock:
+                _inflight.pop(key, None)
+    return wrapper
 
 
 @st.cache_data(ttl=600)
 def fetch_assets():
-    # Pull active US equities and group by exchange for lightweight categorization
+    # Pull active US equities and group by exchange for lightweight categorization.
+    # Categories are derived here so the sort rides along in the cached result instead of every rerun.
     if api is None:
-        return [], {}
+        return [], {}, ()
     assets = api.list_assets(status="active", asset_class="us_equity")
     t2c = {}
     syms = []
@@ -36,11 +196,11 @@ def fetch_assets():
         t2c[a.symbol] = cat
         syms.append(a.symbol)
     unique_syms = sorted(set(syms))
-    return unique_syms, t2c
+    categories = tuple(sorted(set(t2c.values())))
+    return unique_syms, t2c, categories
 
 
-all_tickers, ticker_to_category = fetch_assets()
-all_categories = sorted(list(set(ticker_to_category.values())))
+all_tickers, ticker_to_category, all_categories = fetch_assets()
 
 st.title("Trading Bot Dashboard")
 
@@ -57,7 +217,8 @@ st.subheader("Ticker Selection")
 ticker_input = st.text_input(
     "Enter tickers (comma-separated)",
     value="AAPL, MSFT, GOOGL, AMZN, TSLA",
-    help="e.g., AAPL, MSFT, GOOGL"
+    help="e.g., AAPL, MSFT, GOOGL",
+    key="ticker_input"
 )
 
 # Parse and validate tickers
@@ -75,14 +236,15 @@ st.markdown("---")
 st.subheader("Volatility Filter (Optional)")
 st.caption("Filter stocks by Average True Range (ATR) to remove excessively volatile tickers.")
 
-use_volatility_filter = st.checkbox("Apply ATR Volatility Filter", value=False)
+use_volatility_filter = st.checkbox("Apply ATR Volatility Filter", value=False, key="use_volatility_filter")
 volatility_threshold = st.slider(
     "Max ATR as % of Price (volatility threshold)",
     min_value=1,
     max_value=20,
     value=5,
     step=1,
-    help="Remove stocks where ATR > this % of current price"
+    help="Remove stocks where ATR > this % of current price",
+    key="volatility_threshold"
 )
 
 filtered_by_volatility = tickers_for_trade
@@ -120,26 +282,49 @@ tickers_for_trade = filtered_by_volatility
 st.markdown("---")
 
 # Auto-Trade toggle
-auto_trade = st.checkbox("Enable Auto-Trade for selected stocks")
-refresh_interval = st.number_input("Auto-Trade interval (minutes)", min_value=1, value=5)
+auto_trade = st.checkbox("Enable Auto-Trade for selected stocks", key="auto_trade")
+refresh_interval = st.number_input("Auto-Trade interval (minutes)", min_value=1, value=5, key="refresh_interval")
+show_minute_charts = st.checkbox(
+    "Show minute-bar charts in trade results",
+    value=False,
+    help="Builds a price/MA chart per traded stock; leave off to skip the figures entirely",
+    key="show_minute_charts"
+)
 
 # --- Manual Trade Button ---
-run_manual_trade = st.button("Run Manual Trade Check & Execute")
+run_manual_trade = st.button("Run Manual Trade Check & Execute", key="run_manual_trade")
 st.markdown("---")
 
 # ------------------------------
 # Yahoo Finance Analysis Functions
 # ------------------------------
+# yf.Ticker memoizes .info/.news on the instance, so shared instances are rotated on the same
+# 10-minute cadence as the st.cache_data TTLs rather than serving stale data past them
+YF_TICKER_TTL = 600
+
+
+@functools.lru_cache(maxsize=2048)
+def _yf_ticker(symbol, _bucket):
+    return yf.Ticker(symbol)
+
+
+def yf_ticker(symbol):
+    """Returns a shared yf.Ticker for symbol, reused across fetchers within the current TTL window."""
+    return _yf_ticker(symbol, int(time.time() // YF_TICKER_TTL))
+
 @st.cache_data(ttl=600)
 def get_yahoo_week_data(symbol):
     """Fetch 1-week historical data from Yahoo Finance with technical indicators."""
     try:
-        ticker = yf.Ticker(symbol)
+        # yfinance-cache persists daily prices and only requests bars that aren't final yet
+        ticker = yfc.Ticker(symbol)
         # Get 1 week of data (5 trading days) with 1-day interval
         hist = ticker.history(period="1mo", interval="1d")
         
-        if hist.empty:
+        if hist is None or hist.empty:
             return None
+        # Drop yfinance-cache's bookkeeping columns (FetchDate, Final?, ...)
+        hist = hist[['Open', 'High', 'Low', 'Close', 'Volume']].copy()
         
         # Calculate technical indicators
         hist['MA5'] = hist['Close'].rolling(window=5).mean()
@@ -162,10 +347,12 @@ def get_yahoo_week_data(symbol):
         return None
 
 @st.cache_data(ttl=600)
+@coalesce
+@disk_cache(cache_if=lambda result: result["Summary"] != "Data unavailable")
 def get_yahoo_analysis(symbol):
     """Fetches price info and basic data from Yahoo Finance. Cached for 10 minutes."""
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = yf_ticker(symbol)
         
         # Get basic info (more reliable than recommendations/news)
         info = ticker.info
@@ -196,17 +383,27 @@ def get_yahoo_analysis(symbol):
 # ------------------------------
 
 def _score_headline(text: str) -> int:
-    t = text.lower()
-    pos = sum(1 for w in POS_WORDS if w in t)
-    neg = sum(1 for w in NEG_WORDS if w in t)
-    return pos - neg  # >0 bullish, <0 bearish
+    # Matches must start a word, so inflections ("gains", "falls") count but words that merely
+    # contain a keyword ("again", "enterprise") don't; the longest keyword wins at each start
+    text = text.lower()
+    hits = {}
+    for end, (word, sign) in SENTIMENT_AUTOMATON.iter(text):
+        start = end - len(word) + 1
+        if start and (text[start - 1].isalnum() or text[start - 1] == "_"):
+            continue
+        if start not in hits or len(word) > len(hits[start][0]):
+            hits[start] = (word, sign)
+    # Each keyword counts once per headline, however often it appears
+    return sum(sign for _, sign in set(hits.values()))  # >0 bullish, <0 bearish
 
 
 @st.cache_data(ttl=600)
+@coalesce
+@disk_cache(cache_if=lambda result: not result["empty"])
 def get_news_signal(symbol, limit=20):
     """Fetch Yahoo Finance news and derive a simple BUY/SELL/HOLD signal from headlines."""
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = yf_ticker(symbol)
         news_items = []
         attr_news = getattr(ticker, "news", None)
         if isinstance(attr_news, list):
@@ -225,7 +422,6 @@ def get_news_signal(symbol, limit=20):
         st.warning(f"⚠️ Could not fetch news for {symbol}: {e}")
         news_items = []
 
-    scores = []
     headlines = []
     news_details = []
     
@@ -246,12 +442,13 @@ def get_news_signal(symbol, limit=20):
             "link": link,
             "time": pd.to_datetime(published_time, unit='s').strftime('%Y-%m-%d %H:%M') if published_time else "N/A"
         })
-        scores.append(_score_headline(title))
 
-    if not scores:
+    if not headlines:
         return {"symbol": symbol, "news_signal": "HOLD", "news_score": 0.0, "headlines": [], "news_details": [], "empty": True}
 
-    avg = sum(scores) / len(scores)
+    # Per-headline scores are small ints (|score| <= keyword count), so int8 holds them
+    scores = np.fromiter((_score_headline(h) for h in headlines), dtype=np.int8, count=len(headlines))
+    avg = float(scores.mean())
     if avg > 0.5:
         signal = "BUY"
     elif avg < -0.5:
@@ -268,6 +465,67 @@ def get_news_signal(symbol, limit=20):
         "empty": False,
     }
 
+
+def get_rendered_news(symbol, news_details):
+    """Returns (expander label, markdown body) pairs for a symbol's news, cached in session state per day.
+
+    Headlines don't change meaningfully within a market day, so reruns reuse the formatted
+    strings and each expander renders with a single st.markdown call.
+    """
+    if not news_details:
+        # Don't pin an empty fetch for the whole day; retry on the next rerun
+        return []
+    today = date.today().isoformat()
+    news_cache = st.session_state.setdefault("news_cache", {})
+    news_key = (symbol, today)
+    if news_key not in news_cache:
+        # Drop entries from previous days so the cache doesn't grow across sessions
+        for stale_key in [k for k in news_cache if k[1] != today]:
+            del news_cache[stale_key]
+        news_cache[news_key] = [
+            (
+                f"📰 {i}. {news['title'][:80]}...",
+                f"**Publisher:** {news['publisher']}\n\n"
+                f"**Published:** {news['time']}\n\n"
+                f"**Link:** [{news['title']}]({news['link']})"
+            )
+            for i, news in enumerate(news_details, 1)
+        ]
+    return news_cache[news_key]
+
+
+def fetch_parallel(fn, symbols):
+    """Runs fn(symbol) for every symbol on a thread pool and returns results in input order.
+
+    The per-symbol fetchers are network-bound, so threads overlap the Yahoo/Alpaca round-trips.
+    Workers are attached to the current script run so st.warning/st.error inside the fetchers
+    still reach the page; all other rendering stays on the main thread.
+    """
+    if not symbols:
+        return []
+    ctx = get_script_run_ctx()
+
+    def run(symbol):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(symbol)
+
+    with ThreadPoolExecutor(max_workers=min(MAX_FETCH_WORKERS, len(symbols))) as executor:
+        return list(executor.map(run, symbols))
+
+
+def get_yahoo_analysis_batch(symbols):
+    """Returns {symbol: get_yahoo_analysis(symbol)} for all symbols, fetched on the thread pool.
+
+    yfinance routes every Ticker through its shared HTTP session, so the concurrent .info scrapes
+    reuse pooled keep-alive connections; each lookup still goes through the L1/L2 caches.
+    """
+    return dict(zip(symbols, fetch_parallel(get_yahoo_analysis, list(symbols))))
+
+
+def get_news_signal_batch(symbols):
+    """Returns {symbol: get_news_signal(symbol)} for all symbols, fetched on the thread pool."""
+    return dict(zip(symbols, fetch_parallel(get_news_signal, list(symbols))))
+
 # ------------------------------
 # 1-Week Analysis with Yahoo Finance
 # ------------------------------
@@ -325,7 +583,7 @@ def analyze_stock_1week(symbol):
     reasons = []
     
     # MA crossover analysis
-    if pd.notna(ma5) and pd.notna(ma10):
+    if not _isnan(ma5) and not _isnan(ma10):
         if ma5 > ma10 and current_price > ma5:
             tech_signal = "BUY"
             tech_strength += 2
@@ -336,7 +594,7 @@ def analyze_stock_1week(symbol):
             reasons.append("MA5 < MA10 with price below MA5")
     
     # RSI analysis
-    if pd.notna(rsi):
+    if not _isnan(rsi):
         if rsi < 30:
             tech_strength += 1
             reasons.append(f"RSI oversold ({rsi:.1f})")
@@ -384,9 +642,9 @@ def analyze_stock_1week(symbol):
         "Symbol": symbol,
         "Price": f"${current_price:.2f}",
         "Week_Change_%": round(week_change_pct, 2),
-        "MA5": round(ma5, 2) if pd.notna(ma5) else "N/A",
-        "MA10": round(ma10, 2) if pd.notna(ma10) else "N/A",
-        "RSI": round(rsi, 1) if pd.notna(rsi) else "N/A",
+        "MA5": "N/A" if _isnan(ma5) else round(ma5, 2),
+        "MA10": "N/A" if _isnan(ma10) else round(ma10, 2),
+        "RSI": "N/A" if _isnan(rsi) else round(rsi, 1),
         "Volume_Ratio": round(volume_ratio, 2),
         "Tech_Signal": tech_signal,
         "News_Signal": news_signal,
@@ -399,20 +657,132 @@ def analyze_stock_1week(symbol):
     }
 
 
+@dataclass(slots=True)
+class AnalysisRow:
+    """Render-side view of an `analyze_stock_1week` result.
+
+    Built once per rerun so the render loop uses slot attributes instead of dict lookups and
+    the week_data column-presence checks are done up front.
+    """
+    symbol: str
+    price: str
+    week_change_pct: float
+    rsi: object
+    tech_signal: str
+    news_signal: str
+    news_score: float
+    final_signal: str
+    confidence: str
+    reasons: str
+    week_data: Optional[pd.DataFrame] = None
+    news_details: List[dict] = field(default_factory=list)
+    has_ma5: bool = False
+    has_ma10: bool = False
+    has_vol_ma: bool = False
+
+    @classmethod
+    def from_analysis(cls, analysis: dict) -> "AnalysisRow":
+        week_data = analysis.get("week_data")
+        if week_data is not None and week_data.empty:
+            week_data = None
+        columns = week_data.columns if week_data is not None else ()
+        return cls(
+            symbol=analysis["Symbol"],
+            price=analysis.get("Price", "N/A"),
+            week_change_pct=analysis.get("Week_Change_%", 0),
+            rsi=analysis.get("RSI", "N/A"),
+            tech_signal=analysis.get("Tech_Signal", "HOLD"),
+            news_signal=analysis.get("News_Signal", "HOLD"),
+            news_score=analysis.get("News_Score", 0),
+            final_signal=analysis.get("Final_Signal", analysis.get("Signal", "HOLD")),
+            confidence=analysis.get("Confidence", "N/A"),
+            reasons=analysis.get("Reasons", analysis.get("Recommendation", "")),
+            week_data=week_data,
+            news_details=analysis.get("news_details", []),
+            has_ma5="MA5" in columns,
+            has_ma10="MA10" in columns,
+            has_vol_ma="Volume_MA" in columns,
+        )
+
+
 # --- Helper functions for data retrieval and plotting ---
 
+def _isnan(x):
+    """Scalar missing-value check for floats/None; cheaper than the pd.isna dispatcher."""
+    return x is None or x != x
+
+
+def fast_ma(close, window, csum=None):
+    """Trailing simple moving average along the last axis from a running sum; same values as
+    Series.rolling(window).mean(), with the first window - 1 entries NaN.
+    Pass `csum` (cumsum of close with a leading 0) to share one pass across windows."""
+    if csum is None:
+        close = np.asarray(close, dtype=float)
+        csum = np.concatenate((np.zeros(close.shape[:-1] + (1,)), np.cumsum(close, axis=-1)), axis=-1)
+    n = csum.shape[-1] - 1
+    ma = np.full(csum.shape[:-1] + (n,), np.nan)
+    if n >= window:
+        ma[..., window - 1:] = (csum[..., window:] - csum[..., :-window]) / window
+    return ma
+
+
+def add_trend_mas(df, ma1, ma2):
+    """Adds ma{ma1} / ma{ma2} close-price columns in place, both off a single cumsum."""
+    close = df["close"].to_numpy(dtype=float)
+    if np.isnan(close).any():
+        # A running sum would carry one missing bar into every later average
+        df[f"ma{ma1}"] = df["close"].rolling(window=ma1).mean()
+        df[f"ma{ma2}"] = df["close"].rolling(window=ma2).mean()
+        return df
+    csum = np.concatenate(([0.0], np.cumsum(close)))
+    df[f"ma{ma1}"] = fast_ma(close, ma1, csum)
+    df[f"ma{ma2}"] = fast_ma(close, ma2, csum)
+    return df
+
+
+def add_trend_mas_batch(frames, ma1, ma2):
+    """add_trend_mas over {symbol: DataFrame}. Equal-length, gap-free histories share one
+    symbol x time cumsum; anything else goes through add_trend_mas frame by frame."""
+    dfs = list(frames.values())
+    if dfs and len({len(df) for df in dfs}) == 1:
+        closes = np.vstack([df["close"].to_numpy(dtype=float) for df in dfs])
+        if not np.isnan(closes).any():
+            csum = np.concatenate((np.zeros((len(dfs), 1)), np.cumsum(closes, axis=1)), axis=1)
+            for df, short, long in zip(dfs, fast_ma(closes, ma1, csum), fast_ma(closes, ma2, csum)):
+                df[f"ma{ma1}"] = short
+                df[f"ma{ma2}"] = long
+            return frames
+    for df in dfs:
+        add_trend_mas(df, ma1, ma2)
+    return frames
+
+
+def yahoo_trend_fallback(symbol, ma1, ma2):
+    """get_trend_data's Yahoo week of daily bars (lowercase columns, MAs added), marked in attrs so
+    the disk cache doesn't store it under the Alpaca key."""
+    week_data = get_yahoo_week_data(symbol)
+    if week_data is None:
+        return None
+    # Normalize column names to lowercase for consistency
+    week_data.columns = [col.lower() if isinstance(col, str) else col for col in week_data.columns]
+    add_trend_mas(week_data, ma1, ma2)
+    week_data.attrs["yahoo_fallback"] = True
+    return week_data
+
+
 @st.cache_data(ttl=600)
+@coalesce
+@disk_cache(
+    category=lambda args: "get_trend_data_Minute" if args["_timeframe"] is TimeFrame.Minute else "get_trend_data_Day",
+    cache_if=lambda df: df is not None and not df.attrs.get("yahoo_fallback", False),
+)
 def get_trend_data(symbol, _timeframe=TimeFrame.Day, limit=30, ma1=10, ma2=20):
     """Fetches bar data and calculates MAs for trend analysis. Cached for 10 minutes.
     Note: _timeframe is excluded from cache hash (prefixed with underscore)."""
     if api is None:
         # Try Yahoo Finance as fallback
-        week_data = get_yahoo_week_data(symbol)
+        week_data = yahoo_trend_fallback(symbol, ma1, ma2)
         if week_data is not None:
-            # Normalize column names to lowercase for consistency
-            week_data.columns = [col.lower() if isinstance(col, str) else col for col in week_data.columns]
-            week_data[f"ma{ma1}"] = week_data["close"].rolling(window=ma1).mean()
-            week_data[f"ma{ma2}"] = week_data["close"].rolling(window=ma2).mean()
             return week_data
         st.error(f"⚠️ Cannot fetch data for {symbol}: Alpaca API not initialized. Check API credentials.")
         return None
@@ -420,42 +790,79 @@ def get_trend_data(symbol, _timeframe=TimeFrame.Day, limit=30, ma1=10, ma2=20):
         df = api.get_bars(symbol, _timeframe, limit=limit).df
         if df.empty:
             # Fallback to Yahoo Finance
-            week_data = get_yahoo_week_data(symbol)
+            week_data = yahoo_trend_fallback(symbol, ma1, ma2)
             if week_data is not None:
-                # Normalize column names to lowercase for consistency
-                week_data.columns = [col.lower() if isinstance(col, str) else col for col in week_data.columns]
-                week_data[f"ma{ma1}"] = week_data["close"].rolling(window=ma1).mean()
-                week_data[f"ma{ma2}"] = week_data["close"].rolling(window=ma2).mean()
                 return week_data
             st.warning(f"⚠️ No data returned for {symbol} ({_timeframe})")
             return None
         
-        df[f"ma{ma1}"] = df["close"].rolling(window=ma1).mean()
-        df[f"ma{ma2}"] = df["close"].rolling(window=ma2).mean()
+        add_trend_mas(df, ma1, ma2)
         return df
     except Exception as e:
         # Fallback to Yahoo Finance
-        week_data = get_yahoo_week_data(symbol)
+        week_data = yahoo_trend_fallback(symbol, ma1, ma2)
         if week_data is not None:
-            # Normalize column names to lowercase for consistency
-            week_data.columns = [col.lower() if isinstance(col, str) else col for col in week_data.columns]
-            week_data[f"ma{ma1}"] = week_data["close"].rolling(window=ma1).mean()
-            week_data[f"ma{ma2}"] = week_data["close"].rolling(window=ma2).mean()
             return week_data
         st.error(f"❌ Error fetching data for {symbol}: {e}")
         print(f"Error fetching data for {symbol}: {e}")
         return None
 
+def bars_window_start(timeframe, limit):
+    """RFC3339 start of a window that holds at least `limit` bars of `timeframe`, allowing for
+    weekends and market holidays (390 regular-session minute bars per trading day)."""
+    if timeframe is TimeFrame.Minute:
+        days = math.ceil(limit / 390) + 4
+    else:
+        days = math.ceil(limit * 7 / 5) + 10
+    return (pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=days)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def get_trend_data_batch(symbols, _timeframe=TimeFrame.Day, limit=30, ma1=10, ma2=20):
+    """Fetches bars for all symbols in one Alpaca request and returns {symbol: DataFrame with MAs}.
+    Cached for 10 minutes, per timeframe. Pass symbols as a tuple so it can be hashed."""
+    return _trend_data_batch(symbols, _timeframe.value, limit, ma1, ma2, _timeframe)
+
+
 @st.cache_data(ttl=600)
-def analyze_trend(symbol):
+def _trend_data_batch(symbols, timeframe_value, limit, ma1, ma2, _timeframe):
+    """get_trend_data_batch's cached body; timeframe_value keeps Day and Minute batches apart.
+
+    A multi-symbol response is sorted by symbol and Alpaca's `limit` caps the whole response, so
+    no combined limit is sent: the request covers an explicit start window (paginated by the
+    client) and each symbol keeps its last `limit` bars. Symbols with fewer than `limit` bars, or
+    missing from the batch, fall back to get_trend_data (which also covers the Yahoo fallback)."""
+    frames = {}
+    if api is not None and symbols:
+        try:
+            bars = api.get_bars(list(symbols), _timeframe, start=bars_window_start(_timeframe, limit)).df
+            if not bars.empty and "symbol" in bars.columns:
+                frames = add_trend_mas_batch({
+                    sym: df.drop(columns="symbol").tail(limit).copy()
+                    for sym, df in bars.groupby("symbol")
+                    if len(df) >= limit
+                }, ma1, ma2)
+        except Exception as e:
+            print(f"Batched bar fetch failed, falling back to per-symbol requests: {e}")
+
+    for sym in symbols:
+        if sym not in frames:
+            frames[sym] = get_trend_data(sym, _timeframe=_timeframe, limit=limit, ma1=ma1, ma2=ma2)
+    return frames
+
+@st.cache_data(ttl=600)
+def analyze_trend(symbol, _df=None, _analyst=None, _news=None):
     """Generates the trend signal and returns summary metrics. Cached for 10 minutes.
     
     Integrates technical signals (MA crossover) with analyst recommendations:
     - BUY + Strong Buy/Outperform rec → STRONG BUY
     - BUY + Hold/Neutral rec → HOLD
     - SELL only executes if rec is Underperform/Sell, otherwise HOLD
+
+    _df: daily bars already loaded by get_trend_data_batch (excluded from the cache hash).
+    _analyst: result already loaded by get_yahoo_analysis_batch (excluded from the cache hash).
+    _news: result already loaded by get_news_signal_batch (excluded from the cache hash).
     """
-    df = get_trend_data(symbol, _timeframe=TimeFrame.Day, limit=30, ma1=10, ma2=20)
+    df = _df if _df is not None else get_trend_data(symbol, _timeframe=TimeFrame.Day, limit=30, ma1=10, ma2=20)
     
     if df is None or len(df) < 20:
         return {"Symbol": symbol, "Signal": "NO DATA"}
@@ -468,7 +875,7 @@ def analyze_trend(symbol):
     ma20_val = latest.get("ma20")
 
     # Technical signal from MA crossover
-    if pd.isna(ma10_val) or pd.isna(ma20_val):
+    if _isnan(ma10_val) or _isnan(ma20_val):
         tech_signal = "HOLD"
     elif pct_change > 2 and ma10_val > ma20_val:
         tech_signal = "BUY"
@@ -478,7 +885,7 @@ def analyze_trend(symbol):
         tech_signal = "HOLD"
 
     # Fetch analyst recommendation
-    analyst_data = get_yahoo_analysis(symbol)
+    analyst_data = _analyst if _analyst is not None else get_yahoo_analysis(symbol)
     analyst_rec = analyst_data.get("Summary", "").lower()  # e.g., "PE: 25 | ..."
     
     # Integrate analyst recommendation with technical signal
@@ -492,15 +899,15 @@ def analyze_trend(symbol):
         if "underperform" not in analyst_rec and "sell" not in analyst_rec:
             signal = "HOLD"  # Don't sell unless rec supports it
 
-    news_sig = get_news_signal(symbol)
+    news_sig = _news if _news is not None else get_news_signal(symbol)
 
     return {
         "Symbol": symbol,
         "Category": ticker_to_category.get(symbol, "Uncategorized"),
         "Close": round(latest["close"], 2),
         "1M %": round(pct_change, 2),
-        "MA10": round(ma10_val, 2) if not pd.isna(ma10_val) else None,
-        "MA20": round(ma20_val, 2) if not pd.isna(ma20_val) else None,
+        "MA10": None if _isnan(ma10_val) else round(ma10_val, 2),
+        "MA20": None if _isnan(ma20_val) else round(ma20_val, 2),
         "Tech Signal": tech_signal,
         "Signal": signal,
         "News Signal": news_sig.get("news_signal"),
@@ -514,55 +921,146 @@ def plot_analysis(df, symbol, timeframe_label):
         st.warning(f"No data to plot for {symbol}.")
         return
 
-    # Reset index to make timestamp a column for Plotly
-    df_plot = df.reset_index()
-    
-    # Create figure
-    fig = go.Figure()
-    
-    # Add Close Price trace
-    fig.add_trace(go.Scatter(
-        x=df_plot.index,
-        y=df_plot['close'],
-        mode='lines',
-        name='Close Price',
-        line=dict(color='blue', width=2)
-    ))
-    
-    # Add MA10 trace
-    if 'ma10' in df_plot.columns:
-        fig.add_trace(go.Scatter(
-            x=df_plot.index,
-            y=df_plot['ma10'],
-            mode='lines',
-            name='MA10',
-            line=dict(color='green', width=1, dash='dash')
-        ))
-    
-    # Add MA20 trace
-    if 'ma20' in df_plot.columns:
-        fig.add_trace(go.Scatter(
-            x=df_plot.index,
-            y=df_plot['ma20'],
-            mode='lines',
-            name='MA20',
-            line=dict(color='red', width=1, dash='dash')
-        ))
-    
-    # Update layout
-    fig.update_layout(
+    import plotly.express as px  # only this chart uses it; loaded on the first render
+
+    # One long frame (bar, series, price) -> one px.line call instead of a go.Scatter per series
+    series_names = {"close": "Close Price", "ma10": "MA10", "ma20": "MA20"}
+    columns = [c for c in series_names if c in df.columns]
+    df_long = (
+        df[columns]
+        .rename(columns=series_names)
+        .reset_index(drop=True)
+        .rename_axis("bar")
+        .reset_index()
+        .melt(id_vars="bar", var_name="series", value_name="price")
+    )
+
+    fig = px.line(
+        df_long,
+        x="bar",
+        y="price",
+        color="series",
+        line_dash="series",
+        color_discrete_map={"Close Price": "blue", "MA10": "green", "MA20": "red"},
+        line_dash_map={"Close Price": "solid", "MA10": "dash", "MA20": "dash"},
         title=f'{symbol} Price and Moving Averages ({timeframe_label})',
-        xaxis_title='Time',
-        yaxis_title='Price (USD)',
-        hovermode='x unified',
+        labels={"bar": "Time", "price": "Price (USD)", "series": ""},
         height=500,
         template='plotly_white'
     )
+    fig.update_traces(line_width=1)
+    fig.update_traces(line_width=2, selector=dict(name="Close Price"))
+    fig.update_layout(hovermode='x unified')
     
     # Display the interactive plot in Streamlit
     st.plotly_chart(fig, use_container_width=True)
 
 
+def plot_week_grid(analysis_results):
+    """Renders every symbol's 1-week candlestick + MA5/MA10 as small multiples in one Plotly figure.
+
+    One figure (and one Streamlit Plotly component) for the whole watchlist instead of one per symbol.
+    """
+    charted = [a for a in analysis_results if a.week_data is not None]
+    if not charted:
+        st.warning("No chart data available")
+        return
+
+    n_cols = min(len(charted), 2)
+    n_rows = math.ceil(len(charted) / n_cols)
+    fig = make_subplots(
+        rows=n_rows,
+        cols=n_cols,
+        subplot_titles=[a.symbol for a in charted],
+        vertical_spacing=0.08 if n_rows > 1 else 0.1
+    )
+
+    for i, analysis in enumerate(charted):
+        row, col = i // n_cols + 1, i % n_cols + 1
+        week_data = analysis.week_data
+        first = i == 0
+
+        fig.add_trace(go.Candlestick(
+            x=week_data.index,
+            open=week_data['Open'],
+            high=week_data['High'],
+            low=week_data['Low'],
+            close=week_data['Close'],
+            name='Price',
+            legendgroup='Price',
+            showlegend=first
+        ), row=row, col=col)
+
+        if analysis.has_ma5:
+            fig.add_trace(go.Scatter(
+                x=week_data.index,
+                y=week_data['MA5'],
+                mode='lines',
+                name='MA5',
+                legendgroup='MA5',
+                showlegend=first,
+                line=dict(color='orange', width=2)
+            ), row=row, col=col)
+
+        if analysis.has_ma10:
+            fig.add_trace(go.Scatter(
+                x=week_data.index,
+                y=week_data['MA10'],
+                mode='lines',
+                name='MA10',
+                legendgroup='MA10',
+                showlegend=first,
+                line=dict(color='blue', width=2)
+            ), row=row, col=col)
+
+    fig.update_xaxes(rangeslider_visible=False)
+    fig.update_layout(
+        title='1 Week Price Action',
+        height=350 * n_rows,
+        template='plotly_white'
+    )
+
+    st.plotly_chart(fig, use_container_width=True, key="week_grid")
+
+
+@njit("float64(float64[:], float64[:], float64[:], int64)", cache=True, fastmath=True)
+def _atr_kernel(high, low, close, period):
+    # Mean true range of the last `period` bars; bar 0 only supplies the first previous close
+    n = high.shape[0]
+    total = 0.0
+    for i in range(n - period, n):
+        prev_close = close[i - 1]
+        total += max(high[i] - low[i], abs(high[i] - prev_close), abs(low[i] - prev_close))
+    return total / period
+
+
+def _atr(bars, period=14):
+    """Latest `period`-bar Average True Range, computed on the last period + 1 bars only."""
+    if bars is None or len(bars) < period + 1:
+        return float("nan")
+    high = bars["high"].to_numpy(dtype=float)[-period - 1:]
+    low = bars["low"].to_numpy(dtype=float)[-period - 1:]
+    close = bars["close"].to_numpy(dtype=float)[-period - 1:]
+    # fastmath assumes finite inputs, so incomplete bars are rejected here rather than in the kernel
+    if np.isnan(high).any() or np.isnan(low).any() or np.isnan(close).any():
+        return float("nan")
+    return _atr_kernel(high, low, close, period)
+
+
+def _position_size(portfolio_equity, entry_price, atr_val, risk_percent, max_risk_atr_multiplier):
+    if portfolio_equity <= 0 or entry_price <= 0:
+        return 0
+    if _isnan(atr_val) or atr_val <= 0:
+        return 0
+
+    per_share_risk = atr_val * max_risk_atr_multiplier
+    if per_share_risk <= 0:
+        return 0
+
+    qty = int(portfolio_equity * risk_percent / per_share_risk)
+    return max(qty, 0)
+
+
 def calculate_position_size(entry_price, symbol, risk_percent=0.01, max_risk_atr_multiplier=2):
     """Calculate position size based on 14-day ATR and risk % of portfolio.
 
@@ -577,40 +1075,40 @@ def calculate_position_size(entry_price, symbol, risk_percent=0.01, max_risk_atr
         if portfolio_equity <= 0 or entry_price <= 0:
             return 0
 
-        risk_cap = portfolio_equity * risk_percent
-
         bars = api.get_bars(symbol, TimeFrame.Day, limit=30).df
         if bars is None or bars.empty or len(bars) < 15:
             return 0
 
-        high = bars["high"]
-        low = bars["low"]
-        close = bars["close"]
-        prev_close = close.shift(1)
-        tr = pd.concat([
-            high - low,
-            (high - prev_close).abs(),
-            (low - prev_close).abs()
-        ], axis=1).max(axis=1)
-        atr = tr.rolling(window=14).mean()
-        atr_val = atr.iloc[-1]
-
-        if pd.isna(atr_val) or atr_val <= 0:
-            return 0
-
-        per_share_risk = atr_val * max_risk_atr_multiplier
-        if per_share_risk <= 0:
-            return 0
-
-        qty = int(risk_cap / per_share_risk)
-        return max(qty, 0)
+        return _position_size(portfolio_equity, entry_price, _atr(bars), risk_percent, max_risk_atr_multiplier)
     except Exception as e:
         print(f"{symbol}: error calculating position size -> {e}")
         return 0
 
 
+def calculate_position_size_batch(entry_prices, risk_percent=0.01, max_risk_atr_multiplier=2):
+    """calculate_position_size for several symbols at once: {symbol: entry_price} -> {symbol: qty}.
+    One account lookup, and daily bars come from the batched (cached) get_trend_data_batch."""
+    sizes = {sym: 0 for sym in entry_prices}
+    try:
+        if api is None or not entry_prices:
+            return sizes
+        account = api.get_account()
+        portfolio_equity = float(getattr(account, "equity", 0))
+        if portfolio_equity <= 0:
+            return sizes
+
+        frames = get_trend_data_batch(tuple(entry_prices), _timeframe=TimeFrame.Day, limit=30, ma1=10, ma2=20)
+        for sym, entry_price in entry_prices.items():
+            sizes[sym] = _position_size(
+                portfolio_equity, entry_price, _atr(frames.get(sym)), risk_percent, max_risk_atr_multiplier
+            )
+    except Exception as e:
+        print(f"Error calculating batch position sizes -> {e}")
+    return sizes
+
+
 def analyze_pnl(trade_log_df):
-    """Pair BUY/OPEN entries with subsequent SELLs to derive realized PnL and win rate."""
+    """Pair BUY/OPEN entries with subsequent SELLs (FIFO) to derive realized PnL and win rate."""
     if trade_log_df is None or trade_log_df.empty:
         return {
             "realized_pnl": 0.0,
@@ -646,69 +1144,120 @@ def analyze_pnl(trade_log_df):
     elif "time" in df.columns:
         df = df.sort_values("time")
 
-    open_buys = {}
-    pairs = []
+    syms, prices, qtys, is_buy, is_sell = _pnl_event_arrays(df, action_col, qty_col)
 
-    for _, row in df.iterrows():
-        sym = str(row["symbol"]).upper()
-        status = str(row.get("status", "")).upper()
-        action = str(row[action_col]).upper() if action_col else ""
-        try:
-            price = float(row["price"])
-        except Exception:
-            continue
-
-        qty_val = 1.0
-        if qty_col and pd.notna(row.get(qty_col)):
-            try:
-                qty_val = float(row[qty_col])
-            except Exception:
-                qty_val = 1.0
+    # Group by symbol with one stable argsort, so each group keeps its time order
+    order = np.argsort(syms, kind="stable")
+    group_syms, group_starts = np.unique(syms[order], return_index=True)
+    group_bounds = np.append(group_starts, len(order))
 
-        if action == "BUY" and status == "OPEN":
-            open_buys.setdefault(sym, []).append({"price": price, "qty": qty_val})
+    pair_frames = []
+    for sym, lo, hi in zip(group_syms, group_bounds[:-1], group_bounds[1:]):
+        rows = order[lo:hi]
+        buy_idx, sell_idx, matched_qty = _match_fifo(qtys[rows], is_buy[rows], is_sell[rows])
+        if not len(matched_qty):
             continue
+        buy_rows = rows[buy_idx]
+        sell_rows = rows[sell_idx]
+        buy_price = prices[buy_rows]
+        sell_price = prices[sell_rows]
+        # built-in round: np.round resolves half-cent ties differently
+        pnl = [round(v, 2) for v in ((sell_price - buy_price) * matched_qty).tolist()]
+        pair_frames.append(pd.DataFrame({
+            "symbol": sym,
+            "buy_price": np.round(buy_price, 4),
+            "sell_price": np.round(sell_price, 4),
+            "qty": matched_qty,
+            "pnl": pnl,
+            "_order": sell_rows,
+        }))
+
+    if pair_frames:
+        # Restore chronological (sell-time) order across symbols.
+        pair_details = (
+            pd.concat(pair_frames, ignore_index=True)
+            .sort_values("_order", kind="stable")
+            .drop(columns="_order")
+            .reset_index(drop=True)
+        )
+    else:
+        pair_details = pd.DataFrame()
 
-        if action == "SELL" and sym in open_buys and open_buys[sym]:
-            sell_qty = qty_val
-            sell_price = price
-
-            while sell_qty > 0 and open_buys[sym]:
-                buy_trade = open_buys[sym][0]
-                matched_qty = min(buy_trade["qty"], sell_qty)
-                pnl = (sell_price - buy_trade["price"]) * matched_qty
-
-                pairs.append({
-                    "symbol": sym,
-                    "buy_price": round(buy_trade["price"], 4),
-                    "sell_price": round(sell_price, 4),
-                    "qty": matched_qty,
-                    "pnl": round(pnl, 2),
-                })
-
-                buy_trade["qty"] -= matched_qty
-                sell_qty -= matched_qty
-
-                if buy_trade["qty"] <= 0:
-                    open_buys[sym].pop(0)
-                else:
-                    break
-
-    paired_count = len(pairs)
-    realized_pnl = round(sum(p["pnl"] for p in pairs), 2)
-    wins = sum(1 for p in pairs if p["pnl"] > 0)
+    paired_count = len(pair_details)
+    realized_pnl = round(sum(pair_details["pnl"].tolist()), 2) if paired_count else 0.0
+    wins = int((pair_details["pnl"] > 0).sum()) if paired_count else 0
     win_rate = round((wins / paired_count) * 100, 2) if paired_count else 0.0
 
     return {
         "realized_pnl": realized_pnl,
         "win_rate": win_rate,
         "paired_trades": paired_count,
-        "pair_details": pd.DataFrame(pairs),
+        "pair_details": pair_details,
     }
 
-def process_stock(symbol, qty=1):
+
+def _pnl_event_arrays(df, action_col, qty_col):
+    """Column arrays for a time-sorted trade log, extracted once: symbol, price, qty, is_buy
+    (BUY and OPEN), is_sell. Rows whose price doesn't parse are dropped; missing qty counts as 1."""
+    n = len(df)
+    syms = df["symbol"].astype(str).str.upper().to_numpy()
+    action = df[action_col].astype(str).str.upper().to_numpy() if action_col else np.full(n, "")
+    status = df["status"].astype(str).str.upper().to_numpy()
+    prices = pd.to_numeric(df["price"], errors="coerce").to_numpy(dtype=float)
+    if qty_col:
+        qtys = pd.to_numeric(df[qty_col], errors="coerce").fillna(1.0).to_numpy(dtype=float)
+    else:
+        qtys = np.ones(n)
+
+    is_buy = (action == "BUY") & (status == "OPEN")
+    is_sell = action == "SELL"
+    valid = ~np.isnan(prices)
+    return syms[valid], prices[valid], qtys[valid], is_buy[valid], is_sell[valid]
+
+
+def _match_fifo(qty, is_buy, is_sell):
+    """FIFO-match one symbol's time-ordered BUY/SELL events without a per-row loop.
+
+    Open buys form a queue measured in shares; each sell consumes from its head,
+    but never past the shares bought before it (excess sell qty is dropped).
+    The consumed position after sell k is C_k = min(C_{k-1} + s_k, A_k), which
+    unrolls to C = S + min(0, cummin(A - S)) with S = cumsum(sell qty) and A the
+    buy qty available at each sell. Each [C_{k-1}, C_k) span is then cut at the
+    buy boundaries to give (buy index, sell index, matched qty) triples.
+    """
+    positions = np.arange(len(qty))
+    buy_cum_all = np.cumsum(np.where(is_buy, qty, 0.0))
+    buy_pos = positions[is_buy]
+    sell_pos = positions[is_sell]
+    if not len(buy_pos) or not len(sell_pos):
+        empty = np.empty(0, dtype=int)
+        return empty, empty, np.empty(0)
+
+    buy_end = buy_cum_all[is_buy]
+    sell_qty = qty[is_sell]
+    sell_cum = np.cumsum(sell_qty)
+    available = buy_cum_all[is_sell]
+    consumed = sell_cum + np.minimum(0.0, np.minimum.accumulate(available - sell_cum))
+
+    total = consumed[-1]
+    cuts = np.unique(np.concatenate(([0.0], buy_end, consumed)))
+    cuts = cuts[cuts <= total]
+    starts, ends = cuts[:-1], cuts[1:]
+    matched_qty = ends - starts
+    keep = matched_qty > 1e-9
+    starts, matched_qty = starts[keep], matched_qty[keep]
+
+    buy_idx = buy_pos[np.searchsorted(buy_end, starts, side="right")]
+    sell_idx = sell_pos[np.searchsorted(consumed, starts, side="right")]
+    return buy_idx, sell_idx, matched_qty
+
+
+def process_stock(symbol, qty=1, df=None, position_size=None):
     # Function to process stock (kept mostly the same, but using the new data getter)
-    df = get_trend_data(symbol, _timeframe=TimeFrame.Minute, limit=200, ma1=10, ma2=20)
+    # df: minute bars already loaded by get_trend_data_batch, if any
+    # position_size: qty already sized by calculate_position_size_batch, if any
+    if df is None:
+        df = get_trend_data(symbol, _timeframe=TimeFrame.Minute, limit=200, ma1=10, ma2=20)
     
     if df is None or len(df) < 20:
         return f"{symbol}: Not enough minute data"
@@ -717,7 +1266,7 @@ def process_stock(symbol, qty=1):
     ma10_val = latest.get("ma10")
     ma20_val = latest.get("ma20")
 
-    if pd.isna(ma10_val) or pd.isna(ma20_val):
+    if _isnan(ma10_val) or _isnan(ma20_val):
         signal = "HOLD"
     elif ma10_val > ma20_val:
         signal = "BUY"
@@ -736,7 +1285,10 @@ def process_stock(symbol, qty=1):
         if signal == "BUY" and position_qty == 0:
             # Determine size via ATR-based risk model (1% portfolio risk, ATR*2 stop proxy)
             entry_price = latest["close"]
-            qty_to_trade = calculate_position_size(entry_price, symbol, risk_percent=0.01, max_risk_atr_multiplier=2)
+            if position_size is not None:
+                qty_to_trade = position_size
+            else:
+                qty_to_trade = calculate_position_size(entry_price, symbol, risk_percent=0.01, max_risk_atr_multiplier=2)
             if qty_to_trade <= 0:
                 st.warning(f"{symbol}: position size = 0 (insufficient equity or ATR data). Skipping buy.")
             else:
@@ -757,16 +1309,16 @@ def process_stock(symbol, qty=1):
             if api is not None:
                 api.submit_order(symbol=symbol, qty=position_qty, side="sell", type="market", time_in_force="gtc")
     
-    # Plot minute data - Make it more visible with an option to hide
-    st.markdown(f"##### 📊 Minute-Bar Chart for {symbol}")
-    df_plot = get_trend_data(symbol, _timeframe=TimeFrame.Minute, limit=200, ma1=10, ma2=20)
-    plot_analysis(df_plot, symbol, "200 Min Bars")
+    # Plot minute data - only built when the chart toggle is on, and collapsed until opened
+    if show_minute_charts:
+        with st.expander(f"📊 Minute-Bar Chart for {symbol}", expanded=False):
+            plot_analysis(df, symbol, "200 Min Bars")
 
     return {
         "Symbol": symbol,
         "Close": round(latest['close'], 2),
-        "MA10": round(ma10_val, 2) if not pd.isna(ma10_val) else None,
-        "MA20": round(ma20_val, 2) if not pd.isna(ma20_val) else None,
+        "MA10": None if _isnan(ma10_val) else round(ma10_val, 2),
+        "MA20": None if _isnan(ma20_val) else round(ma20_val, 2),
         "Signal": signal,
         "Position": position_qty
     }
@@ -778,10 +1330,17 @@ def run_trade_execution(symbols_to_process):
     st.subheader("Trade Execution Results")
     num_cols = min(len(symbols_to_process), 3) if symbols_to_process else 1
     cols = st.columns(num_cols)
+    frames = get_trend_data_batch(tuple(symbols_to_process), _timeframe=TimeFrame.Minute, limit=200, ma1=10, ma2=20)
+    position_sizes = {}
+    if auto_trade:
+        # Size every candidate up front: one account lookup and one daily-bar batch for the whole run
+        position_sizes = calculate_position_size_batch({
+            sym: df["close"].iloc[-1] for sym, df in frames.items() if df is not None and not df.empty
+        }, risk_percent=0.01, max_risk_atr_multiplier=2)
     
     for i, symbol in enumerate(symbols_to_process):
         with cols[i % max(1, num_cols)]: 
-            result = process_stock(symbol, qty=1)
+            result = process_stock(symbol, qty=1, df=frames.get(symbol), position_size=position_sizes.get(symbol))
             if isinstance(result, dict):
                 results.append(result)
                 st.markdown(f"**{symbol} Trade Status**")
@@ -798,22 +1357,22 @@ def run_trade_execution(symbols_to_process):
 if selected_symbols:
     # 1. Display 1-Week Analysis Summary Table
     st.markdown("### 📊 1-Week Analysis Summary")
-    analysis_results = []
-    
-    for sym in selected_symbols:
-        analysis = analyze_stock_1week(sym)
-        analysis_results.append(analysis)
+    # Sorted so each symbol keeps the same position in the widget tree across reruns
+    analysis_results = [
+        AnalysisRow.from_analysis(analysis)
+        for analysis in fetch_parallel(analyze_stock_1week, sorted(selected_symbols))
+    ]
     
     # Display summary table
     summary_df = pd.DataFrame([{
-        "Symbol": a["Symbol"],
-        "Price": a["Price"],
-        "Week %": a["Week_Change_%"],
-        "RSI": a["RSI"],
-        "Tech Signal": a["Tech_Signal"],
-        "News Signal": a["News_Signal"],
-        "Final Signal": a["Final_Signal"],
-        "Confidence": a["Confidence"]
+        "Symbol": a.symbol,
+        "Price": a.price,
+        "Week %": a.week_change_pct,
+        "RSI": a.rsi,
+        "Tech Signal": a.tech_signal,
+        "News Signal": a.news_signal,
+        "Final Signal": a.final_signal,
+        "Confidence": a.confidence
     } for a in analysis_results])
     
     # Color code the signals
@@ -831,198 +1390,220 @@ if selected_symbols:
 
     st.markdown("---")
 
-    # 2. Detailed Analysis for Each Stock
+    # 2. 1-Week price charts for all stocks in a single grid figure
+    detailed_charts = st.checkbox(
+        "Show detailed chart per stock",
+        value=False,
+        help="Render a separate candlestick and volume chart inside each stock's section instead of one combined grid",
+        key="detailed_charts"
+    )
+    if not detailed_charts:
+        st.markdown("### 📈 1-Week Price Charts (Yahoo Finance)")
+        plot_week_grid(analysis_results)
+        st.markdown("---")
+
+    # 3. Detailed Analysis for Each Stock
     st.markdown("### 📈 Detailed Stock Analysis with News & Charts")
     
     for analysis in analysis_results:
-        sym = analysis["Symbol"]
-        st.markdown("---")
-        st.markdown(f"## 📊 {sym} - Detailed Analysis")
-        
-        # Create three columns for key metrics
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.metric("Current Price", analysis["Price"], f"{analysis['Week_Change_%']}% (1W)")
-            st.metric("RSI", analysis["RSI"])
-        
-        with col2:
-            signal_emoji = "🟢" if "BUY" in analysis["Final_Signal"] else "🔴" if "SELL" in analysis["Final_Signal"] else "🟡"
-            st.metric("Final Signal", f"{signal_emoji} {analysis['Final_Signal']}")
-            st.metric("Confidence", analysis["Confidence"])
-        
-        with col3:
-            st.metric("Tech Signal", analysis["Tech_Signal"])
-            st.metric("News Signal", f"{analysis['News_Signal']} ({analysis['News_Score']})")
-        
-        # Analysis Reasoning
-        st.markdown("#### 🔍 Analysis Reasoning")
-        st.info(analysis["Reasons"])
-        
-        # 1-Week Chart with Technical Indicators
-        st.markdown("#### 📈 1-Week Price Chart (Yahoo Finance)")
-        week_data = analysis.get("week_data")
-        if week_data is not None and not week_data.empty:
-            fig = go.Figure()
-            
-            # Candlestick chart
-            fig.add_trace(go.Candlestick(
-                x=week_data.index,
-                open=week_data['Open'],
-                high=week_data['High'],
-                low=week_data['Low'],
-                close=week_data['Close'],
-                name='Price'
-            ))
-            
-            # Add MA5
-            if 'MA5' in week_data.columns:
-                fig.add_trace(go.Scatter(
-                    x=week_data.index,
-                    y=week_data['MA5'],
-                    mode='lines',
-                    name='MA5',
-                    line=dict(color='orange', width=2)
-                ))
-            
-            # Add MA10
-            if 'MA10' in week_data.columns:
-                fig.add_trace(go.Scatter(
-                    x=week_data.index,
-                    y=week_data['MA10'],
-                    mode='lines',
-                    name='MA10',
-                    line=dict(color='blue', width=2)
-                ))
-            
-            fig.update_layout(
-                title=f'{sym} - 1 Week Price Action',
-                yaxis_title='Price (USD)',
-                xaxis_title='Date',
-                height=500,
-                template='plotly_white',
-                xaxis_rangeslider_visible=False
+        sym = analysis.symbol
+        # Keyed per symbol so Streamlit matches each section by identity rather than position
+        with st.container(key=f"analysis_{sym}"):
+            # Header and text-only metrics go out as one markdown element; st.metric is kept
+            # for the price since it's the only one with a delta. The symbol is user input, so
+            # every interpolated value is escaped.
+            signal_emoji = "🟢" if "BUY" in analysis.final_signal else "🔴" if "SELL" in analysis.final_signal else "🟡"
+            metrics_html = "".join(
+                f"<div style='flex: 1; min-width: 140px;'>"
+                f"<div style='font-size: 14px; opacity: 0.7;'>{label}</div>"
+                f"<div style='font-size: 24px;'>{html.escape(str(value))}</div></div>"
+                for label, value in (
+                    ("RSI", analysis.rsi),
+                    ("Final Signal", f"{signal_emoji} {analysis.final_signal}"),
+                    ("Confidence", analysis.confidence),
+                    ("Tech Signal", analysis.tech_signal),
+                    ("News Signal", f"{analysis.news_signal} ({analysis.news_score})"),
+                )
             )
+            st.markdown(f"""
+            <hr>
+            <h2>📊 {html.escape(sym)} - Detailed Analysis</h2>
+            <div style='display: flex; flex-wrap: wrap; gap: 16px; margin-bottom: 16px;'>{metrics_html}</div>
+            """, unsafe_allow_html=True)
             
-            st.plotly_chart(fig, use_container_width=True)
-            
-            # Volume chart
-            fig_vol = go.Figure()
-            fig_vol.add_trace(go.Bar(
-                x=week_data.index,
-                y=week_data['Volume'],
-                name='Volume',
-                marker_color='lightblue'
-            ))
-            
-            if 'Volume_MA' in week_data.columns:
-                fig_vol.add_trace(go.Scatter(
-                    x=week_data.index,
-                    y=week_data['Volume_MA'],
-                    mode='lines',
-                    name='Volume MA',
-                    line=dict(color='red', width=2)
-                ))
+            st.metric("Current Price", analysis.price, f"{analysis.week_change_pct}% (1W)")
             
-            fig_vol.update_layout(
-                title=f'{sym} - Trading Volume',
-                yaxis_title='Volume',
-                height=300,
-                template='plotly_white'
-            )
+            # Analysis Reasoning
+            st.info(f"🔍 **Analysis Reasoning:** {analysis.reasons}")
             
-            st.plotly_chart(fig_vol, use_container_width=True)
-        else:
-            st.warning("No chart data available")
-        
-        # News & Blogs Section
-        st.markdown("#### 📰 Latest News & Market Sentiment")
-        news_details = analysis.get("news_details", [])
-        
-        if news_details:
-            for i, news in enumerate(news_details, 1):
-                with st.expander(f"📰 {i}. {news['title'][:80]}..."):
-                    st.markdown(f"**Publisher:** {news['publisher']}")
-                    st.markdown(f"**Published:** {news['time']}")
-                    st.markdown(f"**Link:** [{news['title']}]({news['link']})")
-        else:
-            st.caption("No recent news available for this symbol.")
-        
-        # Execute Trade Button (if Alpaca is connected)
-        if api is not None and analysis["Final_Signal"] in ["STRONG BUY", "STRONG SELL"]:
-            st.markdown("#### 💰 Execute Trade on Alpaca")
+            # 1-Week Chart with Technical Indicators (the combined grid above covers this otherwise)
+            if detailed_charts:
+                st.markdown("#### 📈 1-Week Price Chart (Yahoo Finance)")
+                week_data = analysis.week_data
+                if week_data is not None:
+                    fig = go.Figure()
+                    
+                    # Candlestick chart
+                    fig.add_trace(go.Candlestick(
+                        x=week_data.index,
+                        open=week_data['Open'],
+                        high=week_data['High'],
+                        low=week_data['Low'],
+                        close=week_data['Close'],
+                        name='Price'
+                    ))
+                    
+                    # Add MA5
+                    if analysis.has_ma5:
+                        fig.add_trace(go.Scatter(
+                            x=week_data.index,
+                            y=week_data['MA5'],
+                            mode='lines',
+                            name='MA5',
+                            line=dict(color='orange', width=2)
+                        ))
+                    
+                    # Add MA10
+                    if analysis.has_ma10:
+                        fig.add_trace(go.Scatter(
+                            x=week_data.index,
+                            y=week_data['MA10'],
+                            mode='lines',
+                            name='MA10',
+                            line=dict(color='blue', width=2)
+                        ))
+                    
+                    fig.update_layout(
+                        title=f'{sym} - 1 Week Price Action',
+                        yaxis_title='Price (USD)',
+                        xaxis_title='Date',
+                        height=500,
+                        template='plotly_white',
+                        xaxis_rangeslider_visible=False
+                    )
+                    
+                    st.plotly_chart(fig, use_container_width=True, key=f"week_chart_{sym}")
+                    
+                    # Volume chart
+                    fig_vol = go.Figure()
+                    fig_vol.add_trace(go.Bar(
+                        x=week_data.index,
+                        y=week_data['Volume'],
+                        name='Volume',
+                        marker_color='lightblue'
+                    ))
+                    
+                    if analysis.has_vol_ma:
+                        fig_vol.add_trace(go.Scatter(
+                            x=week_data.index,
+                            y=week_data['Volume_MA'],
+                            mode='lines',
+                            name='Volume MA',
+                            line=dict(color='red', width=2)
+                        ))
+                    
+                    fig_vol.update_layout(
+                        title=f'{sym} - Trading Volume',
+                        yaxis_title='Volume',
+                        height=300,
+                        template='plotly_white'
+                    )
+                    
+                    st.plotly_chart(fig_vol, use_container_width=True, key=f"volume_chart_{sym}")
+                else:
+                    st.warning("No chart data available")
             
-            col_trade1, col_trade2 = st.columns([2, 1])
+            # News & Blogs Section
+            st.markdown("#### 📰 Latest News & Market Sentiment")
+            rendered_news = get_rendered_news(sym, analysis.news_details)
             
-            with col_trade1:
-                qty_input = st.number_input(
-                    f"Quantity to trade for {sym}",
-                    min_value=1,
-                    value=10,
-                    key=f"qty_{sym}"
-                )
+            if rendered_news:
+                for label, body in rendered_news:
+                    with st.expander(label):
+                        st.markdown(body)
+            else:
+                st.caption("No recent news available for this symbol.")
             
-            with col_trade2:
-                if analysis["Final_Signal"] == "STRONG BUY":
-                    if st.button(f"🟢 BUY {sym}", key=f"buy_{sym}", type="primary"):
-                        try:
-                            # Calculate stop loss and take profit
-                            current_price = float(analysis["Price"].replace("$", ""))
-                            stop_loss = current_price * 0.95  # 5% stop loss
-                            take_profit = current_price * 1.10  # 10% take profit
-                            
-                            order = api.submit_order(
-                                symbol=sym,
-                                qty=qty_input,
-                                side="buy",
-                                type="market",
-                                time_in_force="gtc",
-                                order_class="bracket",
-                                take_profit=dict(limit_price=round(take_profit, 2)),
-                                stop_loss=dict(stop_price=round(stop_loss, 2))
-                            )
-                            st.success(f"✅ BUY order submitted for {qty_input} shares of {sym}!")
-                            st.json({
-                                "Order ID": order.id,
-                                "Symbol": sym,
-                                "Qty": qty_input,
-                                "Stop Loss": f"${stop_loss:.2f}",
-                                "Take Profit": f"${take_profit:.2f}"
-                            })
-                        except Exception as e:
-                            st.error(f"❌ Error submitting order: {e}")
+            # Execute Trade Button (if Alpaca is connected)
+            if api is not None and analysis.final_signal in ["STRONG BUY", "STRONG SELL"]:
+                st.markdown("#### 💰 Execute Trade on Alpaca")
                 
-                elif analysis["Final_Signal"] == "STRONG SELL":
-                    if st.button(f"🔴 SELL {sym}", key=f"sell_{sym}", type="secondary"):
-                        try:
-                            # Check if position exists
+                col_trade1, col_trade2 = st.columns([2, 1])
+                
+                with col_trade1:
+                    qty_input = st.number_input(
+                        f"Quantity to trade for {sym}",
+                        min_value=1,
+                        value=10,
+                        key=f"qty_{sym}"
+                    )
+                
+                with col_trade2:
+                    if analysis.final_signal == "STRONG BUY":
+                        if st.button(f"🟢 BUY {sym}", key=f"buy_{sym}", type="primary"):
                             try:
-                                position = api.get_position(sym)
-                                position_qty = int(position.qty)
+                                # Calculate stop loss and take profit
+                                current_price = float(analysis.price.replace("$", ""))
+                                stop_loss = current_price * 0.95  # 5% stop loss
+                                take_profit = current_price * 1.10  # 10% take profit
                                 
                                 order = api.submit_order(
                                     symbol=sym,
-                                    qty=min(qty_input, position_qty),
-                                    side="sell",
+                                    qty=qty_input,
+                                    side="buy",
                                     type="market",
-                                    time_in_force="gtc"
+                                    time_in_force="gtc",
+                                    order_class="bracket",
+                                    take_profit=dict(limit_price=round(take_profit, 2)),
+                                    stop_loss=dict(stop_price=round(stop_loss, 2))
                                 )
-                                st.success(f"✅ SELL order submitted for {min(qty_input, position_qty)} shares of {sym}!")
-                                st.json({"Order ID": order.id, "Symbol": sym, "Qty": min(qty_input, position_qty)})
-                            except:
-                                st.warning(f"No position found for {sym}. Cannot sell.")
-                        except Exception as e:
-                            st.error(f"❌ Error submitting order: {e}")
+                                st.success(f"✅ BUY order submitted for {qty_input} shares of {sym}!")
+                                st.json({
+                                    "Order ID": order.id,
+                                    "Symbol": sym,
+                                    "Qty": qty_input,
+                                    "Stop Loss": f"${stop_loss:.2f}",
+                                    "Take Profit": f"${take_profit:.2f}"
+                                })
+                            except Exception as e:
+                                st.error(f"❌ Error submitting order: {e}")
+                    
+                    elif analysis.final_signal == "STRONG SELL":
+                        if st.button(f"🔴 SELL {sym}", key=f"sell_{sym}", type="secondary"):
+                            try:
+                                # Check if position exists
+                                try:
+                                    position = api.get_position(sym)
+                                    position_qty = int(position.qty)
+                                    
+                                    order = api.submit_order(
+                                        symbol=sym,
+                                        qty=min(qty_input, position_qty),
+                                        side="sell",
+                                        type="market",
+                                        time_in_force="gtc"
+                                    )
+                                    st.success(f"✅ SELL order submitted for {min(qty_input, position_qty)} shares of {sym}!")
+                                    st.json({"Order ID": order.id, "Symbol": sym, "Qty": min(qty_input, position_qty)})
+                                except:
+                                    st.warning(f"No position found for {sym}. Cannot sell.")
+                            except Exception as e:
+                                st.error(f"❌ Error submitting order: {e}")
 
 
 if selected_symbols:
-    trend_rows = []
-    
     # OLD 1-Month Trend Summary Table (kept for backward compatibility)
     with st.expander("📅 View Legacy 1-Month Trend Analysis"):
         st.markdown("### 1-Month Trend Summary Table")
-        for sym in selected_symbols:
-            trend_rows.append(analyze_trend(sym))
+        frames = get_trend_data_batch(tuple(selected_symbols), _timeframe=TimeFrame.Day, limit=30, ma1=10, ma2=20)
+        analyst_by_sym = get_yahoo_analysis_batch(selected_symbols)
+        news_by_sym = get_news_signal_batch(selected_symbols)
+        trend_rows = fetch_parallel(
+            lambda sym: analyze_trend(
+                sym, _df=frames.get(sym), _analyst=analyst_by_sym.get(sym), _news=news_by_sym.get(sym)
+            ),
+            selected_symbols
+        )
         st.dataframe(pd.DataFrame(trend_rows))
 
 # ------------------------------
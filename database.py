@@ -2,201 +2,594 @@
 Database module for Stock Trading SaaS Application
 Handles user authentication, watchlists, trades, and settings
 """
+import os
+import hmac
+import atexit
+import time
+import queue
 import sqlite3
 import hashlib
 import secrets
+import warnings
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional, List, Dict, Tuple
+from typing import Optional, List, Dict, Tuple, Union
+import numpy as np
 import pandas as pd
 
+# hashlib's PBKDF2 (legacy password records) is OpenSSL's PKCS5_PBKDF2_HMAC whenever Python is
+# linked against OpenSSL -- the same C routine the `cryptography` package wraps. Only builds without
+# it fall back to a pure-Python loop, which would make every legacy login crawl.
+if hashlib.pbkdf2_hmac.__module__ != '_hashlib':
+    warnings.warn(
+        "hashlib.pbkdf2_hmac is not OpenSSL-backed; legacy password checks will be slow",
+        RuntimeWarning
+    )
+
+# scrypt cost for new password hashes (n = 2**14, 16MB per hash); stored alongside each hash
+SCRYPT_LOG_N = 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+# Successful logins are remembered for a few minutes so re-authentication skips PBKDF2
+AUTH_CACHE_TTL = 300  # seconds
+AUTH_CACHE_SIZE = 4096
+
+# Alpaca keys are served from memory for this long after a read; other processes' updates
+# become visible once it lapses
+API_KEY_CACHE_TTL = 30  # seconds
+
+# Watchlists and settings are re-read on every Streamlit rerun, so they are also served from
+# memory; this instance's own writes drop the entry immediately, other writers show after the TTL
+USER_DATA_CACHE_TTL = 60  # seconds
+
+# Queued trades (log_trade(wait=False)) are committed together: up to this many rows,
+# or whatever arrives within TRADE_BATCH_WINDOW seconds of the first one
+TRADE_BATCH_SIZE = 1000
+TRADE_BATCH_WINDOW = 0.05
+
+# Hot statements shared by every call site (and pre-compiled on each reader connection)
+# The trade is attached to the user's active session (if any) inside the same statement
+INSERT_TRADE_SQL = """
+    INSERT INTO trades (user_id, session_id, symbol, action, side,
+                       quantity, price, order_id, status, notes)
+    VALUES (?, (SELECT session_id
+                FROM trading_sessions
+                WHERE user_id = ? AND is_active = 1
+                ORDER BY started_at DESC
+                LIMIT 1),
+            ?, ?, ?, ?, ?, ?, 'executed', ?)
+"""
+
+# Records a successful login (and a rehashed password, if any) for the user as just verified
+LOGIN_UPDATE_SQL = """
+    UPDATE users SET last_login = CURRENT_TIMESTAMP, password_hash = ?, salt = ?
+    WHERE user_id = ? AND password_hash = ? AND is_active = 1
+"""
+LOGIN_RETURNING_SQL = """
+    RETURNING user_id, username, email, password_hash, salt,
+              alpaca_api_key, alpaca_api_secret, is_active
+"""
+# UPDATE ... RETURNING needs SQLite 3.35+; older libraries check the rowcount instead
+HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+SELECT_ACTIVE_SESSION_SQL = """
+    SELECT session_id
+    FROM trading_sessions
+    WHERE user_id = ? AND is_active = 1
+    ORDER BY started_at DESC
+    LIMIT 1
+"""
+
+SELECT_SETTING_SQL = """
+    SELECT setting_value
+    FROM user_settings
+    WHERE user_id = ? AND setting_key = ?
+"""
+
+SELECT_SETTING_NUM_SQL = """
+    SELECT value_num, setting_value
+    FROM user_settings
+    WHERE user_id = ? AND setting_key = ?
+"""
+
+UPSERT_SETTING_SQL = """
+    INSERT INTO user_settings (user_id, setting_key, setting_value, value_num)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(user_id, setting_key)
+    DO UPDATE SET setting_value = excluded.setting_value, value_num = excluded.value_num,
+                  updated_at = CURRENT_TIMESTAMP
+"""
+
+# Tables and indexes, created in one transaction by init_database()
+SCHEMA_SQL = """
+-- Users table
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE NOT NULL,
+    email TEXT UNIQUE NOT NULL,
+    password_hash TEXT NOT NULL,
+    salt TEXT NOT NULL,
+    alpaca_api_key TEXT,
+    alpaca_api_secret TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_login TIMESTAMP,
+    is_active INTEGER DEFAULT 1
+);
+
+-- Watchlists table
+CREATE TABLE IF NOT EXISTS watchlists (
+    watchlist_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    symbol TEXT NOT NULL,
+    added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    is_active INTEGER DEFAULT 1,
+    auto_trade_enabled INTEGER DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES users (user_id),
+    UNIQUE(user_id, symbol)
+);
+
+-- Trading sessions table
+CREATE TABLE IF NOT EXISTS trading_sessions (
+    session_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    ended_at TIMESTAMP,
+    is_active INTEGER DEFAULT 1,
+    FOREIGN KEY (user_id) REFERENCES users (user_id)
+);
+
+-- Trades table
+CREATE TABLE IF NOT EXISTS trades (
+    trade_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    session_id INTEGER,
+    symbol TEXT NOT NULL,
+    action TEXT NOT NULL,
+    side TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    price REAL NOT NULL,
+    order_id TEXT,
+    status TEXT DEFAULT 'pending',
+    executed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    notes TEXT,
+    FOREIGN KEY (user_id) REFERENCES users (user_id),
+    FOREIGN KEY (session_id) REFERENCES trading_sessions (session_id)
+);
+
+-- Stock analysis cache table
+CREATE TABLE IF NOT EXISTS analysis_cache (
+    cache_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    symbol TEXT NOT NULL,
+    analysis_data TEXT NOT NULL,
+    cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(symbol)
+);
+
+-- User settings table
+CREATE TABLE IF NOT EXISTS user_settings (
+    setting_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    setting_key TEXT NOT NULL,
+    setting_value TEXT NOT NULL,
+    value_num REAL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users (user_id),
+    UNIQUE(user_id, setting_key)
+);
+
+-- Indexes for the per-user read paths (trade history, active session, watchlist).
+-- user_settings and users lookups are already served by their UNIQUE indexes.
+CREATE INDEX IF NOT EXISTS idx_trades_user_exec ON trades(user_id, executed_at DESC);
+CREATE INDEX IF NOT EXISTS idx_trades_user_symbol ON trades(user_id, symbol, executed_at DESC);
+
+-- Soft-deleted watchlist rows and ended sessions are never read back, so these index
+-- only the active rows
+CREATE INDEX IF NOT EXISTS idx_sessions_active_only
+    ON trading_sessions(user_id, started_at DESC) WHERE is_active = 1;
+CREATE INDEX IF NOT EXISTS idx_watchlists_active_only
+    ON watchlists(user_id, added_at DESC) WHERE is_active = 1;
+"""
+
+# Distinct input spellings whose uppercased symbol is kept; the cache resets when full
+UPPER_CACHE_SIZE = 4096
+
+# Column order of the trade-history SELECTs, used to build their DataFrames directly
+TRADE_COLUMNS = ['trade_id', 'symbol', 'action', 'side', 'quantity', 'price',
+                 'order_id', 'status', 'executed_at', 'notes']
+TRADE_DTYPES = {'trade_id': np.int64, 'quantity': np.int64, 'price': np.float64}
+WATCHLIST_COLUMNS = ('watchlist_id', 'symbol', 'added_at', 'auto_trade_enabled')
+
+# Per-connection prepared-statement cache; comfortably holds every statement in this module
+STATEMENT_CACHE_SIZE = 256
+
+# Read connections per database file, shared by every DatabaseManager opened on it. Each one
+# can hold a ~20MB page cache (see get_connection), so this stays fixed rather than per-core.
+READ_POOL_SIZE = 4
+
+
+class _SharedConnections:
+    """The connections to one database file: a single writer (serialized by a lock) and a
+    pool of readers, opened by the first DatabaseManager on the path and closed by the last"""
+    
+    def __init__(self, write_conn: sqlite3.Connection):
+        self.write_conn = write_conn
+        self.write_lock = threading.Lock()
+        self.read_pool = queue.Queue()
+        # Open DatabaseManager instances using these connections
+        self.refs = 0
+        # Background batch writer for log_trade(wait=False); flushed on interpreter exit.
+        # It belongs to the file, not to a manager, so no instance is kept alive by it.
+        self.trade_queue = queue.Queue()
+        self.trade_writer = threading.Thread(target=self._trade_writer_loop,
+                                             name="trade-log-writer", daemon=True)
+        self.trade_writer.start()
+        atexit.register(self.flush_trades)
+    
+    @contextmanager
+    def writer(self):
+        """Run the block as one BEGIN IMMEDIATE transaction on the shared write connection"""
+        with self.write_lock:
+            conn = self.write_conn
+            # IMMEDIATE takes the write lock up front, so the transaction can't fail half-way
+            # with SQLITE_BUSY when upgrading from a read lock
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+    
+    def flush_trades(self):
+        """Block until every queued trade has been committed"""
+        self.trade_queue.join()
+    
+    def _trade_writer_loop(self):
+        while True:
+            first = self.trade_queue.get()
+            if first is None:
+                # Stop sentinel from close()
+                self.trade_queue.task_done()
+                return
+            batch = [first]
+            deadline = time.monotonic() + TRADE_BATCH_WINDOW
+            while len(batch) < TRADE_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.trade_queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    # Commit what was gathered, then pick the sentinel up again next round
+                    self.trade_queue.task_done()
+                    self.trade_queue.put(None)
+                    break
+                batch.append(item)
+            
+            try:
+                with self.writer() as conn:
+                    conn.executemany(INSERT_TRADE_SQL, [row for row, _ in batch])
+                    last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                # The write lock makes the batch's AUTOINCREMENT ids contiguous
+                first_id = last_id - len(batch) + 1
+                for offset, (_, future) in enumerate(batch):
+                    future.set_result(first_id + offset)
+            except Exception:
+                # Retry row by row so one bad trade doesn't take the rest of the batch with it
+                for row, future in batch:
+                    try:
+                        with self.writer() as conn:
+                            future.set_result(conn.execute(INSERT_TRADE_SQL, row).lastrowid)
+                    except Exception as e:
+                        print(f"Error logging trade: {e}")
+                        future.set_exception(e)
+            finally:
+                for _ in batch:
+                    self.trade_queue.task_done()
+    
+    def close(self):
+        # Commit queued trades and stop the writer thread before its connection goes away
+        atexit.unregister(self.flush_trades)
+        self.trade_queue.put(None)
+        self.trade_writer.join()
+        # Waits for every borrowed reader to come back before closing it
+        for _ in range(READ_POOL_SIZE):
+            self.read_pool.get().close()
+        with self.write_lock:
+            self.write_conn.close()
+
 
 class DatabaseManager:
     """Manages all database operations for the trading platform"""
     
+    # Input symbol -> uppercased form, shared by every instance (see _upper_symbol)
+    _upper_cache: Dict[str, str] = {}
+    # Absolute database path -> its connections, shared by every open instance on that file
+    _shared: Dict[str, _SharedConnections] = {}
+    _shared_lock = threading.Lock()
+    
     def __init__(self, db_path: str = "trading_platform.db"):
         self.db_path = db_path
+        self._shared_key = os.path.abspath(db_path)
+        self._closed = False
+        # user_id -> (fast digest of the verified password, expiry), in LRU order
+        self._verify_cache = OrderedDict()
+        self._verify_lock = threading.Lock()
+        self._verify_key = secrets.token_bytes(32)
+        # user_id -> ((api_key, api_secret), expiry)
+        self._api_key_cache = {}
+        self._api_key_lock = threading.Lock()
+        # user_id -> (watchlist rows, expiry) and user_id -> (settings dict, expiry)
+        self._watchlist_cache = {}
+        self._settings_cache = {}
+        self._user_data_lock = threading.Lock()
+        # Connections are opened once per file and reused so SQLite keeps its page cache
+        # between calls (and across Streamlit sessions)
+        with DatabaseManager._shared_lock:
+            shared = DatabaseManager._shared.get(self._shared_key)
+            if shared is None:
+                shared = self._open_shared()
+                DatabaseManager._shared[self._shared_key] = shared
+            else:
+                self._use_shared(shared)
+            shared.refs += 1
+    
+    def _use_shared(self, shared: _SharedConnections):
+        self._conns = shared
+        self._write_conn = shared.write_conn
+        self._write_lock = shared.write_lock
+        self._read_pool = shared.read_pool
+        self._trade_queue = shared.trade_queue
+    
+    def _open_shared(self) -> _SharedConnections:
+        """Open this file's connections and bring its schema up to date (first instance only)"""
+        write_conn = self.get_connection()
+        # WAL is persistent in the database file, so it only needs setting once
+        write_conn.execute("PRAGMA journal_mode=WAL")
+        shared = _SharedConnections(write_conn)
+        self._use_shared(shared)
         self.init_database()
+        # Readers open after the schema exists so their hot statements can be compiled up front
+        for _ in range(READ_POOL_SIZE):
+            shared.read_pool.put(self._warm_reader(self.get_connection()))
+        return shared
+    
+    def close(self):
+        """Release this instance's connections; the last instance on the file closes them"""
+        if self._closed:
+            return
+        self._closed = True
+        with DatabaseManager._shared_lock:
+            self._conns.refs -= 1
+            if self._conns.refs:
+                return
+            del DatabaseManager._shared[self._shared_key]
+        self._conns.close()
     
     def get_connection(self):
         """Create a new database connection"""
-        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=STATEMENT_CACHE_SIZE
+        )
         conn.row_factory = sqlite3.Row
+        # Per-connection tuning: fsync only at WAL checkpoints, wait on locks instead of failing,
+        # ~20MB page cache, temp tables in memory. No shared cache: each reader keeps its own.
+        conn.executescript("""
+            PRAGMA synchronous=NORMAL;
+            PRAGMA busy_timeout=5000;
+            PRAGMA cache_size=-20000;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA foreign_keys=ON;
+        """)
         return conn
     
+    def _warm_reader(self, conn):
+        """Compile the hot SELECTs into the connection's statement cache (a no-match query
+        prepares the statement without returning rows)"""
+        conn.execute(SELECT_ACTIVE_SESSION_SQL, (-1,)).fetchall()
+        conn.execute(SELECT_SETTING_SQL, (-1, '')).fetchall()
+        conn.execute(SELECT_SETTING_NUM_SQL, (-1, '')).fetchall()
+        return conn
+    
+    @staticmethod
+    def _tuple_cursor(conn, arraysize: int = 1):
+        """Cursor returning plain tuples, for callers that unpack columns by position"""
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.arraysize = arraysize
+        return cursor
+    
+    @contextmanager
+    def reader(self):
+        """Borrow a pooled read connection"""
+        conn = self._read_pool.get()
+        try:
+            yield conn
+        finally:
+            self._read_pool.put(conn)
+    
+    def writer(self):
+        """Run the block as one BEGIN IMMEDIATE transaction on the shared write connection"""
+        return self._conns.writer()
+    
     def init_database(self):
         """Initialize database tables"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Users table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                salt TEXT NOT NULL,
-                alpaca_api_key TEXT,
-                alpaca_api_secret TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_login TIMESTAMP,
-                is_active INTEGER DEFAULT 1
-            )
-        """)
-        
-        # Watchlists table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS watchlists (
-                watchlist_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                symbol TEXT NOT NULL,
-                added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                is_active INTEGER DEFAULT 1,
-                auto_trade_enabled INTEGER DEFAULT 0,
-                FOREIGN KEY (user_id) REFERENCES users (user_id),
-                UNIQUE(user_id, symbol)
-            )
-        """)
-        
-        # Trading sessions table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS trading_sessions (
-                session_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                ended_at TIMESTAMP,
-                is_active INTEGER DEFAULT 1,
-                FOREIGN KEY (user_id) REFERENCES users (user_id)
-            )
-        """)
-        
-        # Trades table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS trades (
-                trade_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                session_id INTEGER,
-                symbol TEXT NOT NULL,
-                action TEXT NOT NULL,
-                side TEXT NOT NULL,
-                quantity INTEGER NOT NULL,
-                price REAL NOT NULL,
-                order_id TEXT,
-                status TEXT DEFAULT 'pending',
-                executed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                notes TEXT,
-                FOREIGN KEY (user_id) REFERENCES users (user_id),
-                FOREIGN KEY (session_id) REFERENCES trading_sessions (session_id)
-            )
-        """)
-        
-        # Stock analysis cache table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS analysis_cache (
-                cache_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                symbol TEXT NOT NULL,
-                analysis_data TEXT NOT NULL,
-                cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(symbol)
-            )
-        """)
-        
-        # User settings table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS user_settings (
-                setting_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                setting_key TEXT NOT NULL,
-                setting_value TEXT NOT NULL,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (user_id),
-                UNIQUE(user_id, setting_key)
-            )
-        """)
-        
-        conn.commit()
-        conn.close()
+        # The whole schema goes down as one script in one transaction: a single sync on a cold
+        # database instead of one per statement. executescript() would commit any transaction
+        # writer() had opened, so the script carries its own BEGIN IMMEDIATE/COMMIT.
+        with self._write_lock:
+            conn = self._write_conn
+            try:
+                conn.executescript("BEGIN IMMEDIATE;\n" + SCHEMA_SQL + "\nCOMMIT;")
+            except sqlite3.Error:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+        
+        with self.writer() as conn:
+            # Numeric settings get a typed shadow column (see save_setting); add it to older databases
+            setting_columns = {row[1] for row in conn.execute("PRAGMA table_info(user_settings)")}
+            if 'value_num' not in setting_columns:
+                conn.execute("ALTER TABLE user_settings ADD COLUMN value_num REAL")
+            
+            # Gather planner statistics once so the partial indexes are preferred
+            has_stats = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+            ).fetchone()
+            if not has_stats:
+                conn.execute("ANALYZE")
     
     # ==================== USER MANAGEMENT ====================
     
     def hash_password(self, password: str, salt: str = None) -> Tuple[str, str]:
-        """Hash password with salt"""
+        """Hash password with salt (scrypt, stored as "scrypt:<log2 n>:<r>:<p>:<hex>")"""
         if salt is None:
             salt = secrets.token_hex(32)
         
-        password_hash = hashlib.pbkdf2_hmac(
-            'sha256',
+        password_hash = hashlib.scrypt(
             password.encode('utf-8'),
-            salt.encode('utf-8'),
-            100000
+            salt=salt.encode('utf-8'),
+            n=2 ** SCRYPT_LOG_N,
+            r=SCRYPT_R,
+            p=SCRYPT_P,
+            dklen=32
         ).hex()
         
-        return password_hash, salt
+        return f"scrypt:{SCRYPT_LOG_N}:{SCRYPT_R}:{SCRYPT_P}:{password_hash}", salt
+    
+    def check_password(self, password: str, salt: str, stored_hash: str) -> bool:
+        """Verify a password against a stored hash in either the scrypt or the legacy PBKDF2 format"""
+        if stored_hash.startswith('scrypt:'):
+            _, log_n, r, p, expected = stored_hash.split(':')
+            candidate = hashlib.scrypt(
+                password.encode('utf-8'),
+                salt=salt.encode('utf-8'),
+                n=2 ** int(log_n),
+                r=int(r),
+                p=int(p),
+                dklen=len(expected) // 2
+            ).hex()
+        else:
+            # Legacy records: bare hex PBKDF2-HMAC-SHA256, 100k iterations
+            expected = stored_hash
+            candidate = hashlib.pbkdf2_hmac(
+                'sha256',
+                password.encode('utf-8'),
+                salt.encode('utf-8'),
+                100000
+            ).hex()
+        
+        return hmac.compare_digest(candidate, expected)
     
     def create_user(self, username: str, email: str, password: str) -> bool:
         """Create a new user"""
         try:
             password_hash, salt = self.hash_password(password)
             
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO users (username, email, password_hash, salt)
-                VALUES (?, ?, ?, ?)
-            """, (username, email, password_hash, salt))
-            
-            conn.commit()
-            conn.close()
+            with self.writer() as conn:
+                conn.execute("""
+                    INSERT INTO users (username, email, password_hash, salt)
+                    VALUES (?, ?, ?, ?)
+                """, (username, email, password_hash, salt))
             return True
         except sqlite3.IntegrityError:
             return False
     
     def authenticate_user(self, username: str, password: str) -> Optional[Dict]:
         """Authenticate user and return user data"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT user_id, username, email, password_hash, salt, 
-                   alpaca_api_key, alpaca_api_secret, is_active
-            FROM users
-            WHERE username = ? AND is_active = 1
-        """, (username,))
-        
-        user = cursor.fetchone()
+        with self.reader() as conn:
+            user = conn.execute("""
+                SELECT user_id, username, email, password_hash, salt,
+                       alpaca_api_key, alpaca_api_secret, is_active
+                FROM users
+                WHERE username = ? AND is_active = 1
+            """, (username,)).fetchone()
         
         if user:
-            password_hash, _ = self.hash_password(password, user['salt'])
+            fast = self._fast_digest(password, user)
             
-            if password_hash == user['password_hash']:
-                # Update last login
-                cursor.execute("""
-                    UPDATE users SET last_login = CURRENT_TIMESTAMP
-                    WHERE user_id = ?
-                """, (user['user_id'],))
-                conn.commit()
+            if self._cached_login(user['user_id'], fast) or self._verify_password(password, user, fast):
+                # Upgrade legacy PBKDF2 hashes now that the plaintext is known to be right
+                password_hash, salt = user['password_hash'], user['salt']
+                rehash = not password_hash.startswith('scrypt:')
+                if rehash:
+                    password_hash, salt = self.hash_password(password)
                 
-                conn.close()
-                return dict(user)
+                # Last login and any rehash in one statement, which only matches while the hash
+                # just verified is still the stored one; RETURNING hands back the row as written
+                params = (password_hash, salt, user['user_id'], user['password_hash'])
+                with self.writer() as conn:
+                    if HAS_RETURNING:
+                        rows = conn.execute(LOGIN_UPDATE_SQL + LOGIN_RETURNING_SQL, params).fetchall()
+                        user = dict(rows[0]) if rows else None
+                    elif conn.execute(LOGIN_UPDATE_SQL, params).rowcount:
+                        user = dict(user, password_hash=password_hash, salt=salt)
+                    else:
+                        user = None
+                
+                if user and rehash:
+                    self._remember_login(user['user_id'], self._fast_digest(password, user))
+                return user
         
-        conn.close()
         return None
     
+    def _fast_digest(self, password: str, user) -> bytes:
+        """Cheap fingerprint of a password attempt; keyed with a per-process secret and bound to the
+        stored hash, so it is useless outside this process and stale once the password changes"""
+        return hashlib.blake2b(
+            user['password_hash'].encode('utf-8') + b'\0' + user['salt'].encode('utf-8') + b'\0'
+            + password.encode('utf-8'),
+            key=self._verify_key,
+            digest_size=16
+        ).digest()
+    
+    def _cached_login(self, user_id: int, fast: bytes) -> bool:
+        """True if this password was verified for the user within AUTH_CACHE_TTL"""
+        with self._verify_lock:
+            entry = self._verify_cache.get(user_id)
+            if entry is None:
+                return False
+            digest, expires = entry
+            if expires < time.monotonic():
+                del self._verify_cache[user_id]
+                return False
+            self._verify_cache.move_to_end(user_id)
+        return hmac.compare_digest(digest, fast)
+    
+    def _verify_password(self, password: str, user, fast: bytes) -> bool:
+        """Full KDF check; remembers the fast digest on success"""
+        if not self.check_password(password, user['salt'], user['password_hash']):
+            return False
+        
+        self._remember_login(user['user_id'], fast)
+        return True
+    
+    def _remember_login(self, user_id: int, fast: bytes):
+        with self._verify_lock:
+            self._verify_cache[user_id] = (fast, time.monotonic() + AUTH_CACHE_TTL)
+            self._verify_cache.move_to_end(user_id)
+            while len(self._verify_cache) > AUTH_CACHE_SIZE:
+                self._verify_cache.popitem(last=False)
+    
     def update_user_api_keys(self, user_id: int, api_key: str, api_secret: str) -> bool:
         """Update user's Alpaca API keys"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                UPDATE users
-                SET alpaca_api_key = ?, alpaca_api_secret = ?
-                WHERE user_id = ?
-            """, (api_key, api_secret, user_id))
-            
-            conn.commit()
-            conn.close()
+            with self.writer() as conn:
+                conn.execute("""
+                    UPDATE users
+                    SET alpaca_api_key = ?, alpaca_api_secret = ?
+                    WHERE user_id = ?
+                """, (api_key, api_secret, user_id))
+            self._remember_api_keys(user_id, api_key, api_secret)
             return True
         except Exception as e:
             print(f"Error updating API keys: {e}")
@@ -204,39 +597,41 @@ class DatabaseManager:
     
     def get_user_api_keys(self, user_id: int) -> Tuple[str, str]:
         """Get user's Alpaca API keys"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT alpaca_api_key, alpaca_api_secret
-            FROM users
-            WHERE user_id = ?
-        """, (user_id,))
-        
-        result = cursor.fetchone()
-        conn.close()
+        with self._api_key_lock:
+            entry = self._api_key_cache.get(user_id)
+        if entry is not None and entry[1] >= time.monotonic():
+            return entry[0]
+        
+        with self.reader() as conn:
+            result = conn.execute("""
+                SELECT alpaca_api_key, alpaca_api_secret
+                FROM users
+                WHERE user_id = ?
+            """, (user_id,)).fetchone()
         
         if result:
-            return result['alpaca_api_key'] or '', result['alpaca_api_secret'] or ''
+            return self._remember_api_keys(user_id, result['alpaca_api_key'], result['alpaca_api_secret'])
         return '', ''
     
+    def _remember_api_keys(self, user_id: int, api_key: str, api_secret: str) -> Tuple[str, str]:
+        keys = (api_key or '', api_secret or '')
+        with self._api_key_lock:
+            self._api_key_cache[user_id] = (keys, time.monotonic() + API_KEY_CACHE_TTL)
+        return keys
+    
     # ==================== WATCHLIST MANAGEMENT ====================
     
     def add_to_watchlist(self, user_id: int, symbol: str, auto_trade: bool = False) -> bool:
         """Add stock to user's watchlist"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO watchlists (user_id, symbol, auto_trade_enabled)
-                VALUES (?, ?, ?)
-                ON CONFLICT(user_id, symbol) 
-                DO UPDATE SET is_active = 1, auto_trade_enabled = ?
-            """, (user_id, symbol.upper(), int(auto_trade), int(auto_trade)))
-            
-            conn.commit()
-            conn.close()
+            with self.writer() as conn:
+                conn.execute("""
+                    INSERT INTO watchlists (user_id, symbol, auto_trade_enabled)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT(user_id, symbol)
+                    DO UPDATE SET is_active = 1, auto_trade_enabled = ?
+                """, (user_id, self._upper_symbol(symbol), int(auto_trade), int(auto_trade)))
+            self._forget_user_data(self._watchlist_cache, user_id)
             return True
         except Exception as e:
             print(f"Error adding to watchlist: {e}")
@@ -245,17 +640,13 @@ class DatabaseManager:
     def remove_from_watchlist(self, user_id: int, symbol: str) -> bool:
         """Remove stock from watchlist"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                UPDATE watchlists
-                SET is_active = 0
-                WHERE user_id = ? AND symbol = ?
-            """, (user_id, symbol.upper()))
-            
-            conn.commit()
-            conn.close()
+            with self.writer() as conn:
+                conn.execute("""
+                    UPDATE watchlists
+                    SET is_active = 0
+                    WHERE user_id = ? AND symbol = ?
+                """, (user_id, self._upper_symbol(symbol)))
+            self._forget_user_data(self._watchlist_cache, user_id)
             return True
         except Exception as e:
             print(f"Error removing from watchlist: {e}")
@@ -263,34 +654,44 @@ class DatabaseManager:
     
     def get_user_watchlist(self, user_id: int) -> List[Dict]:
         """Get user's active watchlist"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT watchlist_id, symbol, added_at, auto_trade_enabled
-            FROM watchlists
-            WHERE user_id = ? AND is_active = 1
-            ORDER BY added_at DESC
-        """, (user_id,))
-        
-        watchlist = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+        cached = self._cached_user_data(self._watchlist_cache, user_id)
+        if cached is not None:
+            return [dict(item) for item in cached]
+        
+        with self.reader() as conn:
+            rows = self._tuple_cursor(conn).execute("""
+                SELECT watchlist_id, symbol, added_at, auto_trade_enabled
+                FROM watchlists
+                WHERE user_id = ? AND is_active = 1
+                ORDER BY added_at DESC
+            """, (user_id,)).fetchall()
+        
+        watchlist = [dict(zip(WATCHLIST_COLUMNS, row)) for row in rows]
+        self._remember_user_data(self._watchlist_cache, user_id, [dict(item) for item in watchlist])
         return watchlist
     
+    def get_auto_trade_symbols(self, user_id: int) -> List[str]:
+        """Symbols on the user's active watchlist with auto-trade enabled, filtered in SQL"""
+        with self.reader() as conn:
+            rows = self._tuple_cursor(conn).execute("""
+                SELECT symbol
+                FROM watchlists
+                WHERE user_id = ? AND is_active = 1 AND auto_trade_enabled = 1
+                ORDER BY added_at DESC
+            """, (user_id,)).fetchall()
+        
+        return [row[0] for row in rows]
+    
     def toggle_auto_trade(self, user_id: int, symbol: str, enabled: bool) -> bool:
         """Toggle auto-trade for a symbol"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                UPDATE watchlists
-                SET auto_trade_enabled = ?
-                WHERE user_id = ? AND symbol = ?
-            """, (int(enabled), user_id, symbol.upper()))
-            
-            conn.commit()
-            conn.close()
+            with self.writer() as conn:
+                conn.execute("""
+                    UPDATE watchlists
+                    SET auto_trade_enabled = ?
+                    WHERE user_id = ? AND symbol = ?
+                """, (int(enabled), user_id, self._upper_symbol(symbol)))
+            self._forget_user_data(self._watchlist_cache, user_id)
             return True
         except Exception as e:
             print(f"Error toggling auto-trade: {e}")
@@ -300,80 +701,58 @@ class DatabaseManager:
     
     def start_trading_session(self, user_id: int) -> int:
         """Start a new trading session"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO trading_sessions (user_id)
-            VALUES (?)
-        """, (user_id,))
-        
-        session_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return session_id
+        with self.writer() as conn:
+            cursor = conn.execute("""
+                INSERT INTO trading_sessions (user_id)
+                VALUES (?)
+            """, (user_id,))
+            return cursor.lastrowid
     
     def end_trading_session(self, session_id: int):
         """End a trading session"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            UPDATE trading_sessions
-            SET ended_at = CURRENT_TIMESTAMP, is_active = 0
-            WHERE session_id = ?
-        """, (session_id,))
-        
-        conn.commit()
-        conn.close()
+        with self.writer() as conn:
+            conn.execute("""
+                UPDATE trading_sessions
+                SET ended_at = CURRENT_TIMESTAMP, is_active = 0
+                WHERE session_id = ?
+            """, (session_id,))
     
     def get_active_session(self, user_id: int) -> Optional[int]:
         """Get active trading session ID"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT session_id
-            FROM trading_sessions
-            WHERE user_id = ? AND is_active = 1
-            ORDER BY started_at DESC
-            LIMIT 1
-        """, (user_id,))
-        
-        result = cursor.fetchone()
-        conn.close()
+        with self.reader() as conn:
+            result = conn.execute(SELECT_ACTIVE_SESSION_SQL, (user_id,)).fetchone()
         
         return result['session_id'] if result else None
     
     # ==================== TRADE MANAGEMENT ====================
     
-    def log_trade(self, user_id: int, symbol: str, action: str, side: str, 
-                  quantity: int, price: float, order_id: str = None, 
-                  notes: str = None) -> int:
-        """Log a trade"""
-        session_id = self.get_active_session(user_id)
+    def log_trade(self, user_id: int, symbol: str, action: str, side: str,
+                  quantity: int, price: float, order_id: str = None,
+                  notes: str = None, wait: bool = True):
+        """Log a trade and return its trade_id.
         
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        With wait=False the row is queued for the batch writer instead, and a Future
+        resolving to the trade_id once its batch commits is returned.
+        """
+        row = (user_id, user_id, self._upper_symbol(symbol), action, side,
+               quantity, price, order_id, notes)
         
-        cursor.execute("""
-            INSERT INTO trades (user_id, session_id, symbol, action, side, 
-                               quantity, price, order_id, status, notes)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'executed', ?)
-        """, (user_id, session_id, symbol.upper(), action, side, 
-              quantity, price, order_id, notes))
+        if not wait:
+            future = Future()
+            self._trade_queue.put((row, future))
+            return future
         
-        trade_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return trade_id
+        with self.writer() as conn:
+            return conn.execute(INSERT_TRADE_SQL, row).lastrowid
+    
+    def flush_trades(self):
+        """Block until every queued trade has been committed"""
+        self._conns.flush_trades()
     
     def get_user_trades(self, user_id: int, limit: int = 100) -> pd.DataFrame:
         """Get user's trade history"""
-        conn = self.get_connection()
-        
         query = """
-            SELECT trade_id, symbol, action, side, quantity, price, 
+            SELECT trade_id, symbol, action, side, quantity, price,
                    order_id, status, executed_at, notes
             FROM trades
             WHERE user_id = ?
@@ -381,75 +760,149 @@ class DatabaseManager:
             LIMIT ?
         """
         
-        df = pd.read_sql_query(query, conn, params=(user_id, limit))
-        conn.close()
-        return df
+        return self._trades_frame(query, (user_id, limit))
+    
+    def count_user_trades(self, user_id: int) -> int:
+        """Number of trades logged for the user (a COUNT on idx_trades_user_exec, no rows fetched)"""
+        self.flush_trades()
+        with self.reader() as conn:
+            return self._tuple_cursor(conn).execute(
+                "SELECT COUNT(*) FROM trades WHERE user_id = ?", (user_id,)
+            ).fetchone()[0]
     
     def get_trades_by_symbol(self, user_id: int, symbol: str) -> pd.DataFrame:
         """Get trades for a specific symbol"""
-        conn = self.get_connection()
-        
         query = """
-            SELECT trade_id, symbol, action, side, quantity, price, 
+            SELECT trade_id, symbol, action, side, quantity, price,
                    order_id, status, executed_at, notes
             FROM trades
             WHERE user_id = ? AND symbol = ?
             ORDER BY executed_at DESC
         """
         
-        df = pd.read_sql_query(query, conn, params=(user_id, symbol.upper()))
-        conn.close()
-        return df
+        return self._trades_frame(query, (user_id, self._upper_symbol(symbol)))
+    
+    def _trades_frame(self, query: str, params: tuple) -> pd.DataFrame:
+        """Run a TRADE_COLUMNS query into a DataFrame assembled column by column"""
+        self.flush_trades()
+        with self.reader() as conn:
+            cursor = self._tuple_cursor(conn, arraysize=1000)
+            cursor.execute(query, params)
+            rows = []
+            while True:
+                chunk = cursor.fetchmany()
+                if not chunk:
+                    break
+                rows.extend(chunk)
+        
+        if not rows:
+            return pd.DataFrame(columns=TRADE_COLUMNS)
+        
+        # Transpose once and give the numeric columns their dtype up front, so pandas
+        # doesn't infer a type cell by cell from an object matrix
+        columns = dict(zip(TRADE_COLUMNS, zip(*rows)))
+        for name, dtype in TRADE_DTYPES.items():
+            columns[name] = np.array(columns[name], dtype=dtype)
+        return pd.DataFrame(columns, columns=TRADE_COLUMNS)
+    
+    @classmethod
+    def _upper_symbol(cls, symbol: str) -> str:
+        """Uppercased symbol, cached so the watchlist/trade paths don't re-allocate it per call"""
+        upper = cls._upper_cache.get(symbol)
+        if upper is None:
+            if len(cls._upper_cache) >= UPPER_CACHE_SIZE:
+                cls._upper_cache.clear()
+            upper = cls._upper_cache[symbol] = symbol.upper()
+        return upper
     
     # ==================== SETTINGS MANAGEMENT ====================
     
-    def save_setting(self, user_id: int, key: str, value: str) -> bool:
-        """Save user setting"""
+    def save_setting(self, user_id: int, key: str, value: Union[str, int, float, bool]) -> bool:
+        """Save user setting; numbers and bools are also stored in value_num for get_setting_float"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO user_settings (user_id, setting_key, setting_value)
-                VALUES (?, ?, ?)
-                ON CONFLICT(user_id, setting_key)
-                DO UPDATE SET setting_value = ?, updated_at = CURRENT_TIMESTAMP
-            """, (user_id, key, value, value))
-            
-            conn.commit()
-            conn.close()
+            with self.writer() as conn:
+                conn.execute(UPSERT_SETTING_SQL, self._setting_params(user_id, key, value))
+            self._forget_user_data(self._settings_cache, user_id)
             return True
         except Exception as e:
             print(f"Error saving setting: {e}")
             return False
     
+    def save_settings_bulk(self, user_id: int, settings: Dict[str, Union[str, int, float, bool]]) -> bool:
+        """Save several user settings in one transaction (all or none); values as in save_setting"""
+        try:
+            with self.writer() as conn:
+                conn.executemany(UPSERT_SETTING_SQL, [
+                    self._setting_params(user_id, key, value) for key, value in settings.items()
+                ])
+            self._forget_user_data(self._settings_cache, user_id)
+            return True
+        except Exception as e:
+            print(f"Error saving settings: {e}")
+            return False
+    
+    @staticmethod
+    def _setting_params(user_id: int, key: str, value: Union[str, int, float, bool]) -> tuple:
+        """UPSERT_SETTING_SQL parameters: bools saved as 'true'/'false', numbers also in value_num"""
+        value_num = float(value) if isinstance(value, (bool, int, float)) else None
+        return user_id, key, DatabaseManager.setting_text(value), value_num
+    
+    @staticmethod
+    def setting_text(value: Union[str, int, float, bool]) -> str:
+        """A setting value as stored in setting_value (and returned by get_all_settings)"""
+        if isinstance(value, bool):
+            return str(value).lower()
+        return str(value)
+    
     def get_setting(self, user_id: int, key: str, default: str = None) -> str:
         """Get user setting"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT setting_value
-            FROM user_settings
-            WHERE user_id = ? AND setting_key = ?
-        """, (user_id, key))
-        
-        result = cursor.fetchone()
-        conn.close()
+        with self.reader() as conn:
+            result = conn.execute(SELECT_SETTING_SQL, (user_id, key)).fetchone()
         
         return result['setting_value'] if result else default
     
+    def get_setting_float(self, user_id: int, key: str, default: float = None) -> Optional[float]:
+        """Get a numeric user setting, straight from value_num when it was saved as a number"""
+        with self.reader() as conn:
+            result = self._tuple_cursor(conn).execute(SELECT_SETTING_NUM_SQL, (user_id, key)).fetchone()
+        
+        if result is None:
+            return default
+        if result[0] is not None:
+            return result[0]
+        # Saved as text (or before value_num existed)
+        try:
+            return float(result[1])
+        except ValueError:
+            return default
+    
     def get_all_settings(self, user_id: int) -> Dict[str, str]:
         """Get all user settings"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT setting_key, setting_value
-            FROM user_settings
-            WHERE user_id = ?
-        """, (user_id,))
-        
-        settings = {row['setting_key']: row['setting_value'] for row in cursor.fetchall()}
-        conn.close()
+        cached = self._cached_user_data(self._settings_cache, user_id)
+        if cached is not None:
+            return dict(cached)
+        
+        with self.reader() as conn:
+            settings = dict(self._tuple_cursor(conn).execute("""
+                SELECT setting_key, setting_value
+                FROM user_settings
+                WHERE user_id = ?
+            """, (user_id,)))
+        self._remember_user_data(self._settings_cache, user_id, dict(settings))
         return settings
+    
+    def _cached_user_data(self, cache: Dict, user_id: int):
+        """Unexpired entry for user_id in the watchlist/settings cache, or None"""
+        with self._user_data_lock:
+            entry = cache.get(user_id)
+        if entry is not None and entry[1] >= time.monotonic():
+            return entry[0]
+        return None
+    
+    def _remember_user_data(self, cache: Dict, user_id: int, value):
+        with self._user_data_lock:
+            cache[user_id] = (value, time.monotonic() + USER_DATA_CACHE_TTL)
+    
+    def _forget_user_data(self, cache: Dict, user_id: int):
+        with self._user_data_lock:
+            cache.pop(user_id, None)
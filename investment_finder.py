@@ -2,12 +2,140 @@
 InvestmentFinderSystem: A class for filtering and analyzing stock universe based on technical criteria.
 """
 
+import os
+import re
+import sys
+import time
+import logging
+import logging.handlers
+import pickle
+import functools
+import threading
+import numpy as np
 import pandas as pd
+from numba import njit, prange
+from numpy.lib.stride_tricks import sliding_window_view
+from concurrent.futures import ThreadPoolExecutor
 from alpaca_trade_api.rest import REST, TimeFrame
 from typing import List, Dict, Tuple
 import yfinance as yf
 from datetime import datetime
 
+# Progress output is buffered and written in chunks (and at the end of each filter/run)
+# rather than one blocking write per line; errors flush immediately
+LOG_BUFFER_RECORDS = 1024
+
+logger = logging.getLogger(__name__)
+# Buffered stdout handler, only attached when the finder runs as a script (see attach_stdout_log);
+# imported by the dashboard, progress goes through the application's logging configuration
+_log_handler = None
+
+# Daily bars fetched per ticker: enough for MA50, and reused by the ATR filter
+BARS_LIMIT = 60
+# Cached bars keep OHLC as float32 (ample for 5-6 significant digit prices, half the memory);
+# the ATR/MA code widens them to float64 when it reads them, so the running sums in the numba
+# kernels (compiled for float64) and NumPy means don't accumulate float32 rounding error
+BARS_PRICE_DTYPES = {"open": np.float32, "high": np.float32, "low": np.float32, "close": np.float32}
+# Fetched bars are reused for this long, so a rerun later in the day still refreshes them
+BARS_CACHE_TTL = 300  # seconds
+# Stocks analyzed concurrently in run_investment_finder (kept small to stay under Yahoo/Alpaca rate limits)
+MAX_ANALYSIS_WORKERS = 8
+
+# Analyst recommendation keywords, one compiled alternation per category so a summary is
+# scanned once per category instead of once per keyword
+ANALYST_BUY_RE = re.compile(r"strong buy|outperform")
+ANALYST_HOLD_RE = re.compile(r"hold|neutral")
+ANALYST_SELL_RE = re.compile(r"sell|underperform")
+
+# Technical signal codes returned by the signal kernels
+TECH_SIGNALS = ("HOLD", "BUY", "SELL")
+
+
+def attach_stdout_log():
+    """Print this module's progress output to stdout through a buffered handler"""
+    global _log_handler
+    if _log_handler is None:
+        _log_handler = logging.handlers.MemoryHandler(
+            LOG_BUFFER_RECORDS,
+            flushLevel=logging.ERROR,
+            target=logging.StreamHandler(sys.stdout)
+        )
+        _log_handler.target.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(_log_handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return _log_handler
+
+
+def _flush_log():
+    """Write out buffered progress at the end of a filter/run (no-op unless attached)"""
+    if _log_handler is not None:
+        _log_handler.flush()
+
+
+@njit("int64(float64, float64, float64, float64)", cache=True)
+def _tech_signal_kernel(ma10, ma20, ma50, close):
+    # BUY: MA10 > MA20 and close > MA50; SELL: MA10 < MA20 and close < MA50; else HOLD.
+    # Comparisons with NaN are false, so incomplete inputs come out HOLD.
+    if ma10 > ma20 and close > ma50:
+        return 1
+    if ma10 < ma20 and close < ma50:
+        return 2
+    return 0
+
+
+@njit("int64[:](float64[:], float64[:], float64[:], float64[:])", cache=True, parallel=True)
+def _batch_tech_signals(ma10, ma20, ma50, close):
+    # _tech_signal_kernel over one array per input (one entry per stock)
+    signals = np.empty(close.shape[0], dtype=np.int64)
+    for i in prange(close.shape[0]):
+        signals[i] = _tech_signal_kernel(ma10[i], ma20[i], ma50[i], close[i])
+    return signals
+
+@njit("float64[:](float64[:], int64)", cache=True)
+def _wilder_rma(values, period):
+    # Wilder's smoothing: seeded with the mean of the first `period` values, then
+    # rma[i] = (rma[i-1] * (period - 1) + values[i]) / period; NaN before the seed
+    out = np.full(values.shape[0], np.nan)
+    if period < 1 or values.shape[0] < period:
+        return out
+    total = 0.0
+    for i in range(period):
+        total += values[i]
+    out[period - 1] = total / period
+    for i in range(period, values.shape[0]):
+        out[i] = (out[i - 1] * (period - 1) + values[i]) / period
+    return out
+
+# Yahoo PE / market cap per symbol are kept in memory and on disk (next to the dashboard's
+# .cache entries) for an hour, so repeated runs don't re-scrape .info for every stock
+YAHOO_CACHE_DIR = os.path.join(".cache", "investment_finder_yahoo")
+YAHOO_CACHE_TTL = 60 * 60  # seconds
+
+
+@functools.lru_cache(maxsize=512)
+def _yahoo_fields(symbol: str, _bucket: int) -> Tuple:
+    """(trailingPE, marketCap) for symbol; _bucket rotates the in-memory entry every YAHOO_CACHE_TTL."""
+    path = os.path.join(YAHOO_CACHE_DIR, f"{symbol}.pkl")
+    try:
+        if time.time() - os.path.getmtime(path) < YAHOO_CACHE_TTL:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+    except (OSError, pickle.PickleError, EOFError):
+        pass
+    
+    info = yf.Ticker(symbol).info
+    fields = (info.get('trailingPE', 'N/A'), info.get('marketCap', 'N/A'))
+    try:
+        os.makedirs(YAHOO_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(fields, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning("Yahoo cache write failed for %s: %s", symbol, e)
+    return fields
+
 
 class InvestmentFinderSystem:
     """
@@ -16,6 +144,10 @@ class InvestmentFinderSystem:
     Filters the universe of stocks based on volatility (ATR) and technical signals.
     """
     
+    # Bracket order legs as multiples of the entry price
+    STOP_LOSS_MULT = 0.95  # 5% below entry
+    TAKE_PROFIT_MULT = 1.10  # 10% above entry
+    
     def __init__(
         self,
         api_key: str,
@@ -33,45 +165,113 @@ class InvestmentFinderSystem:
             api_key: Alpaca API key
             api_secret: Alpaca API secret
             base_url: Alpaca API base URL (e.g., https://paper-api.alpaca.markets)
-            tickers_universe: List of ticker symbols to analyze
+            tickers_universe: List of ticker symbols to analyze; upper-cased, stripped and
+                deduplicated (first occurrence kept), blanks dropped
             short_ma: Period for short-term moving average (default 10)
             long_ma: Period for long-term moving average (default 20)
             atr_period: Period for ATR calculation (default 14)
         """
         self.api = REST(api_key, api_secret, base_url)
-        self.tickers_universe = tickers_universe
+        if not all(isinstance(ticker, str) for ticker in tickers_universe):
+            raise TypeError("tickers_universe must contain only ticker symbol strings")
+        # Normalized once here, so a duplicate never costs another bars/Yahoo lookup per run
+        self.tickers_universe = tuple(dict.fromkeys(
+            symbol for symbol in (ticker.strip().upper() for ticker in tickers_universe) if symbol
+        ))
         self.short_ma = short_ma
         self.long_ma = long_ma
         self.atr_period = atr_period
         self.filtered_universe = []
-        self.atr_data = {}
+        self._reset_atr_arrays()
+        # symbol -> (fetched_at, bars held (at most the limit requested), daily bars)
+        self._bars_cache: Dict[str, Tuple[float, int, pd.DataFrame]] = {}
+        # Symbols with an open position, loaded once per run_investment_finder (None = ask Alpaca per trade)
+        self._open_positions = None
+    
+    def _reset_atr_arrays(self):
+        """
+        Allocate the ATR results as parallel arrays, one slot per universe ticker.
+        
+        _ticker_index maps a ticker to its slot; _atr_filled marks the slots filter_universe
+        computed (tickers with missing or NaN data are left unfilled, as they were absent
+        from the old atr_data dict).
+        """
+        n = len(self.tickers_universe)
+        self._atr_tickers = list(self.tickers_universe)
+        self._ticker_index = {ticker: i for i, ticker in enumerate(self._atr_tickers)}
+        self._atr = np.full(n, np.nan)
+        self._price = np.full(n, np.nan)
+        self._ratio = np.full(n, np.nan)
+        self._passed = np.zeros(n, dtype=bool)
+        self._atr_filled = np.zeros(n, dtype=bool)
+    
+    @property
+    def atr_data(self) -> Dict[str, Dict]:
+        """Per-ticker view of the ATR arrays: ticker -> {atr, price, atr_ratio, passed}."""
+        return {
+            self._atr_tickers[i]: {
+                "atr": float(self._atr[i]),
+                "price": float(self._price[i]),
+                "atr_ratio": float(self._ratio[i]),
+                "passed": bool(self._passed[i])
+            }
+            for i in np.flatnonzero(self._atr_filled)
+        }
     
-    def calculate_atr(self, df: pd.DataFrame, period: int = 14) -> pd.Series:
+    def calculate_atr(self, df: pd.DataFrame, period: int = 14, method: str = "wilder") -> pd.Series:
         """
         Calculate Average True Range (ATR) for volatility measurement.
         
-        ATR = mean of True Range over N periods
         True Range = max(High - Low, |High - Close_prev|, |Low - Close_prev|)
+        - wilder: Wilder's smoothing (RMA) of True Range (the TradingView/TA-Lib definition)
+        - sma: simple mean of True Range over N periods (the original implementation)
         
         Args:
             df: DataFrame with OHLC data (must have 'high', 'low', 'close')
             period: ATR period (default 14)
+            method: 'wilder' (default) or 'sma'
         
         Returns:
             Series of ATR values
         """
-        high = df["high"]
-        low = df["low"]
-        close = df["close"]
-        
-        # Calculate True Range
-        tr1 = high - low
-        tr2 = abs(high - close.shift())
-        tr3 = abs(low - close.shift())
-        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-        
-        # Calculate ATR as rolling mean of TR
-        atr = tr.rolling(window=period).mean()
+        atr = self._calculate_atr_np(
+            df["high"].to_numpy(dtype=np.float64),
+            df["low"].to_numpy(dtype=np.float64),
+            df["close"].to_numpy(dtype=np.float64),
+            period,
+            method
+        )
+        return pd.Series(atr, index=df.index)
+    
+    @staticmethod
+    def _calculate_atr_np(
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        period: int = 14,
+        method: str = "wilder"
+    ) -> np.ndarray:
+        """ATR on raw float64 arrays (NaN until enough bars exist); see calculate_atr."""
+        if method not in ("wilder", "sma"):
+            raise ValueError(f"Unknown ATR method: {method}")
+        
+        prev_close = np.empty_like(close)
+        prev_close[0] = np.nan
+        prev_close[1:] = close[:-1]
+        
+        # True Range; fmax skips NaN like DataFrame.max, so the first bar's TR is High - Low
+        tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+        
+        atr = np.full(len(tr), np.nan)
+        if method == "wilder":
+            # Smoothed from the second bar on, the first with a previous close (as TA-Lib's ATR),
+            # so the first value lands on bar `period`
+            atr[1:] = _wilder_rma(tr[1:], period)
+            return atr
+        
+        # ATR as the mean of each `period`-bar window of TR
+        if len(tr) >= period:
+            atr[period - 1:] = sliding_window_view(tr, period).mean(axis=1)
         return atr
     
     def filter_universe(self, volatility_threshold: float = 0.05) -> Tuple[List[str], Dict[str, float]]:
@@ -89,52 +289,117 @@ class InvestmentFinderSystem:
             - atr_ratios_dict: Dict mapping ticker to ATR/price ratio
         """
         self.filtered_universe = []
-        self.atr_data = {}
+        self._reset_atr_arrays()
         atr_ratios = {}
         
+        # Fetch daily bars for every ticker in one request; BARS_LIMIT covers the 14-day ATR here
+        # and MA50 in run_investment_finder, which then reuses these bars from the cache
+        try:
+            bars_by_ticker = self.get_bars_batch(self.tickers_universe, limit=BARS_LIMIT)
+        except Exception as e:
+            logger.error("Error fetching bars for the universe -> %s", e)
+            bars_by_ticker = {}
+        
         for ticker in self.tickers_universe:
             try:
-                # Fetch 30 daily bars (enough for 14-day ATR + buffers)
-                bars = self.api.get_bars(ticker, TimeFrame.Day, limit=30).df
+                bars = bars_by_ticker.get(ticker)
                 
-                if bars.empty or len(bars) < self.atr_period + 1:
-                    print(f"{ticker}: Insufficient data for ATR calculation (need {self.atr_period + 1} bars)")
+                if bars is None or bars.empty or len(bars) < self.atr_period + 1:
+                    logger.info("%s: Insufficient data for ATR calculation (need %d bars)", ticker, self.atr_period + 1)
                     continue
                 
                 # Calculate ATR
-                atr_series = self.calculate_atr(bars, period=self.atr_period)
-                current_atr = atr_series.iloc[-1]
-                current_price = bars["close"].iloc[-1]
+                close = bars["close"].to_numpy(dtype=np.float64)
+                atr = self._calculate_atr_np(
+                    bars["high"].to_numpy(dtype=np.float64),
+                    bars["low"].to_numpy(dtype=np.float64),
+                    close,
+                    self.atr_period
+                )
+                current_atr = float(atr[-1])
+                current_price = float(close[-1])
                 
                 # Skip NaN ATR (happens in early periods)
-                if pd.isna(current_atr) or pd.isna(current_price):
-                    print(f"{ticker}: ATR or price is NaN, skipping")
+                if current_atr != current_atr or current_price != current_price:
+                    logger.info("%s: ATR or price is NaN, skipping", ticker)
                     continue
                 
                 # Calculate ATR as percentage of price
                 atr_ratio = current_atr / current_price
                 atr_ratios[ticker] = atr_ratio
-                self.atr_data[ticker] = {
-                    "atr": current_atr,
-                    "price": current_price,
-                    "atr_ratio": atr_ratio,
-                    "passed": atr_ratio <= volatility_threshold
-                }
+                i = self._ticker_index[ticker]
+                self._atr[i] = current_atr
+                self._price[i] = current_price
+                self._ratio[i] = atr_ratio
+                self._passed[i] = atr_ratio <= volatility_threshold
+                self._atr_filled[i] = True
                 
                 # Filter: keep only stocks with ATR <= threshold
                 if atr_ratio <= volatility_threshold:
                     self.filtered_universe.append(ticker)
-                    print(f"{ticker}: PASS (ATR: {current_atr:.2f}, Price: {current_price:.2f}, Ratio: {atr_ratio:.4f})")
+                    logger.info("%s: PASS (ATR: %.2f, Price: %.2f, Ratio: %.4f)", ticker, current_atr, current_price, atr_ratio)
                 else:
-                    print(f"{ticker}: FAIL (ATR: {current_atr:.2f}, Price: {current_price:.2f}, Ratio: {atr_ratio:.4f}) - TOO VOLATILE")
+                    logger.info("%s: FAIL (ATR: %.2f, Price: %.2f, Ratio: %.4f) - TOO VOLATILE", ticker, current_atr, current_price, atr_ratio)
             
             except Exception as e:
-                print(f"{ticker}: Error during filter -> {e}")
+                logger.error("%s: Error during filter -> %s", ticker, e)
                 continue
         
-        print(f"\nFiltered Universe: {len(self.filtered_universe)}/{len(self.tickers_universe)} passed")
+        logger.info("\nFiltered Universe: %d/%d passed", len(self.filtered_universe), len(self.tickers_universe))
+        _flush_log()
         return self.filtered_universe, atr_ratios
     
+    def get_bars_batch(self, symbols: List[str], limit: int) -> Dict[str, pd.DataFrame]:
+        """
+        Fetch daily bars for several symbols with a single Alpaca request.
+        
+        Bars fetched within BARS_CACHE_TTL with at least `limit` rows are served from the cache;
+        only the remaining symbols are requested. A multi-symbol response is sorted by symbol and
+        Alpaca's `limit` caps the whole response, so no combined limit is sent: the request covers
+        a start window long enough for `limit` trading days (paginated by the client) and each
+        symbol keeps its last `limit`. A symbol with fewer rows is cached with its actual count,
+        so the next call asks for it again instead of reusing a short frame as complete.
+        Open/high/low/close are stored as float32 (see BARS_PRICE_DTYPES).
+        
+        Args:
+            symbols: Ticker symbols to fetch
+            limit: Number of daily bars wanted per symbol
+        
+        Returns:
+            Dict mapping symbol to its bars DataFrame; symbols missing from the response are absent
+        """
+        now = time.monotonic()
+        missing = [
+            symbol for symbol in symbols
+            if symbol not in self._bars_cache
+            or now - self._bars_cache[symbol][0] > BARS_CACHE_TTL
+            or self._bars_cache[symbol][1] < limit
+        ]
+        
+        if missing:
+            # limit trading days fit in limit * 7/5 calendar days, plus slack for market holidays
+            start = (pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=limit * 7 // 5 + 10)).strftime("%Y-%m-%d")
+            # Unadjusted prices: ATR/MA ratios don't need split/dividend normalization
+            bars = self.api.get_bars(missing, TimeFrame.Day, start=start, adjustment="raw").df
+            if not bars.empty and "symbol" in bars.columns:
+                bars = bars.astype({
+                    column: dtype for column, dtype in BARS_PRICE_DTYPES.items() if column in bars.columns
+                })
+                for symbol, df in bars.groupby("symbol"):
+                    df = df.drop(columns="symbol").tail(limit)
+                    self._bars_cache[symbol] = (now, len(df), df)
+        
+        return {
+            symbol: self._bars_cache[symbol][2].tail(limit).copy()
+            for symbol in symbols
+            if symbol in self._bars_cache
+        }
+    
+    def _yahoo_summary(self, symbol: str) -> Dict[str, str]:
+        """Yahoo fundamentals summary for symbol, served from the in-memory/disk cache when fresh."""
+        pe_ratio, market_cap = _yahoo_fields(symbol, int(time.time() // YAHOO_CACHE_TTL))
+        return {"Summary": f"PE: {pe_ratio} | Market Cap: {market_cap}"}
+    
     def get_filtered_universe(self) -> List[str]:
         """Return the current filtered universe of tickers."""
         return self.filtered_universe
@@ -150,22 +415,25 @@ class InvestmentFinderSystem:
         Returns:
             DataFrame with columns: Ticker, ATR, Price, ATR_Ratio, Passed
         """
-        rows = []
-        for ticker, data in self.atr_data.items():
-            rows.append({
-                "Ticker": ticker,
-                "ATR": round(data["atr"], 2),
-                "Price": round(data["price"], 2),
-                "ATR_Ratio": round(data["atr_ratio"], 4),
-                "Passed": "Yes" if data["passed"] else "No"
-            })
-        return pd.DataFrame(rows)
+        # Built column by column straight from the ATR arrays, rounded in a single pass each
+        filled = self._atr_filled
+        return pd.DataFrame({
+            "Ticker": [self._atr_tickers[i] for i in np.flatnonzero(filled)],
+            "ATR": np.round(self._atr[filled], 2),
+            "Price": np.round(self._price[filled], 2),
+            "ATR_Ratio": np.round(self._ratio[filled], 4),
+            "Passed": np.where(self._passed[filled], "Yes", "No")
+        })
     
     def generate_combined_signal(
         self,
         symbol: str,
-        current_data: pd.DataFrame,
-        yahoo_analysis: Dict
+        ma10: float,
+        ma20: float,
+        ma50: float,
+        close: float,
+        yahoo_analysis: Dict,
+        tech_code: int = None
     ) -> Dict[str, any]:
         """
         Generate a combined technical + fundamental signal for a stock.
@@ -182,8 +450,13 @@ class InvestmentFinderSystem:
         
         Args:
             symbol: Ticker symbol
-            current_data: DataFrame with OHLC data and MA10, MA20, MA50 columns
+            ma10: Latest 10-day moving average of close
+            ma20: Latest 20-day moving average of close
+            ma50: Latest 50-day moving average of close
+            close: Latest close price
             yahoo_analysis: Dict with 'Summary' key containing analyst recommendation string
+            tech_code: Technical signal already computed by _batch_tech_signals (index into
+                TECH_SIGNALS); computed here when omitted
         
         Returns:
             Dict with keys:
@@ -193,30 +466,8 @@ class InvestmentFinderSystem:
             - 'analyst_rec': Extracted analyst recommendation
         """
         
-        if current_data is None or current_data.empty or len(current_data) < 50:
-            return {
-                "signal": "HOLD",
-                "tech_signal": "HOLD",
-                "reason": "Insufficient data for analysis",
-                "analyst_rec": "N/A"
-            }
-        
-        # Get latest data
-        latest = current_data.iloc[-1]
-        close = latest.get("close")
-        
-        # Calculate MA50 if not already in dataframe
-        ma10 = latest.get("ma10")
-        ma20 = latest.get("ma20")
-        
-        if "ma50" not in current_data.columns:
-            current_data["ma50"] = current_data["close"].rolling(window=50).mean()
-            ma50 = current_data["ma50"].iloc[-1]
-        else:
-            ma50 = latest.get("ma50")
-        
-        # Handle NaN values
-        if pd.isna(ma10) or pd.isna(ma20) or pd.isna(ma50) or pd.isna(close):
+        # Handle NaN values (e.g. MAs computed over fewer bars than their window); NaN != NaN
+        if ma10 != ma10 or ma20 != ma20 or ma50 != ma50 or close != close:
             return {
                 "signal": "HOLD",
                 "tech_signal": "HOLD",
@@ -225,14 +476,15 @@ class InvestmentFinderSystem:
             }
         
         # Technical Signal
-        if ma10 > ma20 and close > ma50:
-            tech_signal = "BUY"
+        if tech_code is None:
+            tech_code = _tech_signal_kernel(ma10, ma20, ma50, close)
+        tech_signal = TECH_SIGNALS[tech_code]
+        
+        if tech_signal == "BUY":
             tech_reason = f"MA10({ma10:.2f}) > MA20({ma20:.2f}) AND Close({close:.2f}) > MA50({ma50:.2f})"
-        elif ma10 < ma20 and close < ma50:
-            tech_signal = "SELL"
+        elif tech_signal == "SELL":
             tech_reason = f"MA10({ma10:.2f}) < MA20({ma20:.2f}) AND Close({close:.2f}) < MA50({ma50:.2f})"
         else:
-            tech_signal = "HOLD"
             tech_reason = "No clear crossover pattern or price outside MA50 range"
         
         # Extract analyst recommendation from yahoo_analysis
@@ -243,18 +495,18 @@ class InvestmentFinderSystem:
         fundamental_note = ""
         
         if tech_signal == "BUY":
-            if "strong buy" in analyst_summary or "outperform" in analyst_summary:
+            if ANALYST_BUY_RE.search(analyst_summary):
                 final_signal = "STRONG BUY"
                 fundamental_note = " + Analyst: Strong Buy/Outperform"
-            elif "hold" in analyst_summary or "neutral" in analyst_summary:
+            elif ANALYST_HOLD_RE.search(analyst_summary):
                 final_signal = "HOLD"
                 fundamental_note = " → Downgraded due to Hold/Neutral analyst recommendation"
-            elif "sell" in analyst_summary or "underperform" in analyst_summary:
+            elif ANALYST_SELL_RE.search(analyst_summary):
                 final_signal = "HOLD"
                 fundamental_note = " → Downgraded due to Sell/Underperform analyst recommendation"
         elif tech_signal == "SELL":
             # For SELL signals, only execute if analyst agrees
-            if "sell" in analyst_summary or "underperform" in analyst_summary:
+            if ANALYST_SELL_RE.search(analyst_summary):
                 final_signal = "STRONG SELL"
                 fundamental_note = " + Analyst: Sell/Underperform"
             else:
@@ -318,21 +570,25 @@ class InvestmentFinderSystem:
         
         try:
             # Check if position already exists
-            try:
-                existing_position = self.api.get_position(symbol)
-                if existing_position:
-                    return {
-                        "success": False,
-                        "order_id": None,
-                        "message": f"Position already exists for {symbol}. Skipping trade.",
-                        "qty": 0,
-                        "entry": entry_price,
-                        "stop_loss": None,
-                        "take_profit": None
-                    }
-            except Exception:
-                # No position exists, continue
-                pass
+            if self._open_positions is not None:
+                existing_position = symbol in self._open_positions
+            else:
+                try:
+                    existing_position = self.api.get_position(symbol)
+                except Exception:
+                    # No position exists, continue
+                    existing_position = None
+            
+            if existing_position:
+                return {
+                    "success": False,
+                    "order_id": None,
+                    "message": f"Position already exists for {symbol}. Skipping trade.",
+                    "qty": 0,
+                    "entry": entry_price,
+                    "stop_loss": None,
+                    "take_profit": None
+                }
             
             # Calculate quantity based on risk management
             # qty = (equity_to_risk / risk_percent) / entry_price
@@ -351,8 +607,8 @@ class InvestmentFinderSystem:
                 }
             
             # Calculate stop loss and take profit
-            stop_loss_price = entry_price * 0.95  # 5% below entry
-            take_profit_price = entry_price * 1.10  # 10% above entry
+            stop_loss_price = entry_price * self.STOP_LOSS_MULT
+            take_profit_price = entry_price * self.TAKE_PROFIT_MULT
             
             # Submit bracket order
             order = self.api.submit_order(
@@ -387,6 +643,130 @@ class InvestmentFinderSystem:
                 "take_profit": None
             }
     
+    def _latest_technicals(
+        self,
+        bars_by_symbol: Dict[str, pd.DataFrame]
+    ) -> Dict[str, Tuple[float, float, float, float, int]]:
+        """
+        Latest MA10/MA20/MA50, close and technical signal code for every stock with 50+ bars.
+        
+        The stocks' last 50 closes are stacked into one matrix, so each MA is a single row-wise
+        mean over its trailing columns, and the signals come from one _batch_tech_signals call.
+        
+        Returns:
+            Dict mapping symbol to (ma10, ma20, ma50, close, tech_code)
+        """
+        symbols = [symbol for symbol, bars in bars_by_symbol.items() if len(bars) >= 50]
+        if not symbols:
+            return {}
+        
+        closes = np.vstack([
+            bars_by_symbol[symbol]["close"].to_numpy(dtype=np.float64)[-50:] for symbol in symbols
+        ])
+        ma10 = closes[:, -10:].mean(axis=1)
+        ma20 = closes[:, -20:].mean(axis=1)
+        ma50 = closes.mean(axis=1)
+        close = np.ascontiguousarray(closes[:, -1])
+        signals = _batch_tech_signals(ma10, ma20, ma50, close)
+        
+        return {
+            symbol: (float(ma10[i]), float(ma20[i]), float(ma50[i]), float(close[i]), int(signals[i]))
+            for i, symbol in enumerate(symbols)
+        }
+    
+    def _analyze_symbol(
+        self,
+        symbol: str,
+        bars: pd.DataFrame,
+        technicals: Tuple[float, float, float, float, int],
+        atr_ratio: float,
+        equity_to_risk: float,
+        risk_percent: float
+    ) -> Tuple[List[str], Dict[str, any], Dict[str, any]]:
+        """
+        Analyze one filtered stock and trade it if the signal warrants (steps 2b-2d).
+        
+        Run from worker threads: it only reads shared state (the caller records placed orders in
+        _open_positions), and returns its log lines instead of printing them so concurrent runs
+        don't interleave output. `technicals` is the stock's (ma10, ma20, ma50, close, tech_code)
+        entry from _latest_technicals.
+        
+        Returns:
+            Tuple of (log_lines, analysis_result, executed_trade); the last two are None when
+            the stock was skipped or no trade was placed
+        """
+        log = [f"Analyzing {symbol}..."]
+        try:
+            if bars is None or len(bars) < 50:
+                log.append(f"  ⚠️  Insufficient data ({len(bars) if bars is not None else 0} bars). Skipping.\n")
+                return log, None, None
+            
+            ma10, ma20, ma50, entry_price, tech_code = technicals
+            
+            # 2b. Fetch Yahoo fundamentals
+            try:
+                yahoo_analysis = self._yahoo_summary(symbol)
+            except Exception as e:
+                log.append(f"  ⚠️  Could not fetch Yahoo data: {e}")
+                yahoo_analysis = {"Summary": "N/A"}
+            
+            # 2c. Generate combined signal
+            signal_result = self.generate_combined_signal(
+                symbol, ma10, ma20, ma50, entry_price, yahoo_analysis, tech_code
+            )
+            final_signal = signal_result["signal"]
+            
+            # Log the analysis
+            result = {
+                "symbol": symbol,
+                "price": round(entry_price, 2),
+                "tech_signal": signal_result["tech_signal"],
+                "signal": final_signal,
+                "reason": signal_result["reason"],
+                "atr_ratio": round(atr_ratio, 4)
+            }
+            
+            log.append(f"  Signal: {final_signal} (Tech: {signal_result['tech_signal']})")
+            log.append(f"  Price: ${entry_price:.2f}")
+            log.append(f"  Reason: {signal_result['reason']}\n")
+            
+            # 2d. Execute trade if signal warrants
+            if final_signal not in ["STRONG BUY", "STRONG SELL"]:
+                log.append(f"  ⏸️  No trade signal. Signal={final_signal}\n")
+                return log, result, None
+            
+            log.append(f"  🎯 Executing trade for {symbol}...")
+            
+            # Map STRONG SELL to appropriate signal for execute_trade
+            trade_signal = "STRONG BUY" if final_signal == "STRONG BUY" else final_signal
+            
+            trade_result = self.execute_trade(
+                symbol=symbol,
+                signal=trade_signal,
+                entry_price=entry_price,
+                equity_to_risk=equity_to_risk,
+                risk_percent=risk_percent
+            )
+            
+            if not trade_result["success"]:
+                log.append(f"  ❌ {trade_result['message']}\n")
+                return log, result, None
+            
+            log.append(f"  ✅ {trade_result['message']}")
+            return log, result, {
+                "symbol": symbol,
+                "signal": final_signal,
+                "qty": trade_result["qty"],
+                "entry": trade_result["entry"],
+                "stop_loss": trade_result["stop_loss"],
+                "take_profit": trade_result["take_profit"],
+                "order_id": trade_result["order_id"]
+            }
+        
+        except Exception as e:
+            log.append(f"  ❌ Error analyzing {symbol}: {e}\n")
+            return log, None, None
+    
     def run_investment_finder(
         self,
         volatility_threshold: float = 0.05,
@@ -419,16 +799,17 @@ class InvestmentFinderSystem:
             - 'summary': Text summary of performance
         """
         
-        print(f"\n{'='*80}")
-        print(f"INVESTMENT FINDER RUN - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"{'='*80}\n")
+        logger.info("\n%s", "=" * 80)
+        logger.info("INVESTMENT FINDER RUN - %s", datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        logger.info("%s\n", "=" * 80)
         
         # Step 1: Filter universe by volatility
-        print("STEP 1: Filtering universe by volatility (ATR)...")
+        logger.info("STEP 1: Filtering universe by volatility (ATR)...")
         filtered_stocks, atr_ratios = self.filter_universe(volatility_threshold=volatility_threshold)
         
         if not filtered_stocks:
-            print("⚠️  No stocks passed volatility filter. Exiting.")
+            logger.warning("⚠️  No stocks passed volatility filter. Exiting.")
+            _flush_log()
             return {
                 "timestamp": datetime.now().isoformat(),
                 "filtered_universe": [],
@@ -437,112 +818,76 @@ class InvestmentFinderSystem:
                 "summary": "No stocks passed volatility filter."
             }
         
-        print(f"✅ {len(filtered_stocks)} stocks passed volatility filter: {', '.join(filtered_stocks[:5])}{'...' if len(filtered_stocks) > 5 else ''}\n")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("✅ %d stocks passed volatility filter: %s%s\n", len(filtered_stocks),
+                        ', '.join(filtered_stocks[:5]), '...' if len(filtered_stocks) > 5 else '')
         
         # Step 2: Analyze and trade each stock
         analysis_results = []
         trades_executed = []
         
-        print("STEP 2: Analyzing technical & fundamental data for each stock...\n")
+        # Open positions in one request, so execute_trade doesn't look each symbol up
+        try:
+            self._open_positions = {position.symbol for position in self.api.list_positions()}
+        except Exception as e:
+            logger.warning("⚠️  Could not list open positions, checking per trade: %s", e)
+            self._open_positions = None
         
-        for symbol in filtered_stocks:
-            print(f"Analyzing {symbol}...")
-            try:
-                # 2a. Fetch latest technical data (60 daily bars for MA50)
-                bars = self.api.get_bars(symbol, TimeFrame.Day, limit=60).df
-                
-                if bars is None or len(bars) < 50:
-                    print(f"  ⚠️  Insufficient data ({len(bars) if bars is not None else 0} bars). Skipping.\n")
-                    continue
-                
-                # Calculate moving averages
-                bars["ma10"] = bars["close"].rolling(window=10).mean()
-                bars["ma20"] = bars["close"].rolling(window=20).mean()
-                bars["ma50"] = bars["close"].rolling(window=50).mean()
-                
-                # 2b. Fetch Yahoo fundamentals
-                try:
-                    ticker = yf.Ticker(symbol)
-                    info = ticker.info
-                    yahoo_analysis = {
-                        "Summary": f"PE: {info.get('trailingPE', 'N/A')} | Market Cap: {info.get('marketCap', 'N/A')}"
-                    }
-                except Exception as e:
-                    print(f"  ⚠️  Could not fetch Yahoo data: {e}")
-                    yahoo_analysis = {"Summary": "N/A"}
-                
-                # 2c. Generate combined signal
-                signal_result = self.generate_combined_signal(symbol, bars, yahoo_analysis)
-                final_signal = signal_result["signal"]
-                
-                # Log the analysis
-                entry_price = bars["close"].iloc[-1]
-                result = {
-                    "symbol": symbol,
-                    "price": round(entry_price, 2),
-                    "tech_signal": signal_result["tech_signal"],
-                    "signal": final_signal,
-                    "reason": signal_result["reason"],
-                    "atr_ratio": round(atr_ratios.get(symbol, 0), 4)
-                }
-                analysis_results.append(result)
-                
-                print(f"  Signal: {final_signal} (Tech: {signal_result['tech_signal']})")
-                print(f"  Price: ${entry_price:.2f}")
-                print(f"  Reason: {signal_result['reason']}\n")
-                
-                # 2d. Execute trade if signal warrants
-                if final_signal in ["STRONG BUY", "STRONG SELL"]:
-                    print(f"  🎯 Executing trade for {symbol}...")
-                    
-                    # Map STRONG SELL to appropriate signal for execute_trade
-                    trade_signal = "STRONG BUY" if final_signal == "STRONG BUY" else final_signal
-                    
-                    trade_result = self.execute_trade(
-                        symbol=symbol,
-                        signal=trade_signal,
-                        entry_price=entry_price,
-                        equity_to_risk=equity_to_risk,
-                        risk_percent=risk_percent
-                    )
-                    
-                    if trade_result["success"]:
-                        print(f"  ✅ {trade_result['message']}")
-                        trades_executed.append({
-                            "symbol": symbol,
-                            "signal": final_signal,
-                            "qty": trade_result["qty"],
-                            "entry": trade_result["entry"],
-                            "stop_loss": trade_result["stop_loss"],
-                            "take_profit": trade_result["take_profit"],
-                            "order_id": trade_result["order_id"]
-                        })
-                    else:
-                        print(f"  ❌ {trade_result['message']}\n")
-                else:
-                    print(f"  ⏸️  No trade signal. Signal={final_signal}\n")
-            
-            except Exception as e:
-                print(f"  ❌ Error analyzing {symbol}: {e}\n")
-                continue
+        logger.info("STEP 2: Analyzing technical & fundamental data for each stock...\n")
+        
+        # 2a. Latest technical data (BARS_LIMIT daily bars for MA50), cached by filter_universe
+        try:
+            bars_by_symbol = self.get_bars_batch(filtered_stocks, limit=BARS_LIMIT)
+        except Exception as e:
+            logger.error("  ❌ Error fetching bars: %s\n", e)
+            bars_by_symbol = {}
+        technicals = self._latest_technicals(bars_by_symbol)
+        
+        # 2b-2d per stock run concurrently (Yahoo lookups and order calls are blocking I/O); each
+        # worker buffers its log lines, which are printed here in the original ticker order
+        with ThreadPoolExecutor(max_workers=MAX_ANALYSIS_WORKERS) as executor:
+            outcomes = executor.map(
+                lambda symbol: self._analyze_symbol(
+                    symbol,
+                    bars_by_symbol.get(symbol),
+                    technicals.get(symbol),
+                    atr_ratios.get(symbol, 0),
+                    equity_to_risk,
+                    risk_percent
+                ),
+                filtered_stocks
+            )
+            for log_lines, result, trade in outcomes:
+                for line in log_lines:
+                    logger.info(line)
+                if result is not None:
+                    analysis_results.append(result)
+                if trade is not None:
+                    trades_executed.append(trade)
+                    # Don't buy the same symbol twice within one run (updated here, not in the workers)
+                    if self._open_positions is not None:
+                        self._open_positions.add(trade["symbol"])
         
         # Summary
-        print(f"{'='*80}")
-        print("SUMMARY")
-        print(f"{'='*80}")
-        print(f"Stocks Analyzed: {len(analysis_results)}")
-        print(f"Trades Executed: {len(trades_executed)}")
+        logger.info("%s", "=" * 80)
+        logger.info("SUMMARY")
+        logger.info("%s", "=" * 80)
+        logger.info("Stocks Analyzed: %d", len(analysis_results))
+        logger.info("Trades Executed: %d", len(trades_executed))
         
         if trades_executed:
-            print("\nExecuted Trades:")
+            logger.info("\nExecuted Trades:")
             for trade in trades_executed:
-                print(f"  • {trade['symbol']}: {trade['qty']} shares @ ${trade['entry']:.2f}")
-                print(f"    SL: ${trade['stop_loss']:.2f} | TP: ${trade['take_profit']:.2f}")
+                logger.info("  • %s: %s shares @ $%.2f", trade['symbol'], trade['qty'], trade['entry'])
+                logger.info("    SL: $%.2f | TP: $%.2f", trade['stop_loss'], trade['take_profit'])
         else:
-            print("\nNo trades executed in this run.")
+            logger.info("\nNo trades executed in this run.")
         
         summary_text = f"Analyzed {len(analysis_results)} stocks, executed {len(trades_executed)} trades."
-        print(f"\n{summary_text}\n")
+        # The snapshot is only valid for this run; direct execute_trade calls ask Alpaca again
+        self._open_positions = None
+        logger.info("\n%s\n", summary_text)
+        _flush_log()
         
         return {
             "timestamp": datetime.now().isoformat(),
@@ -552,3 +897,18 @@ class InvestmentFinderSystem:
             "summary": summary_text
         }
 
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python investment_finder.py <ticker> [ticker ...]")
+        print("Example: python investment_finder.py AAPL MSFT NVDA")
+        sys.exit(1)
+    
+    attach_stdout_log()
+    finder = InvestmentFinderSystem(
+        api_key=os.getenv("APCA_API_KEY_ID", ""),
+        api_secret=os.getenv("APCA_API_SECRET_KEY", ""),
+        base_url=os.getenv("APCA_API_BASE_URL", "https://paper-api.alpaca.markets/"),
+        tickers_universe=sys.argv[1:]
+    )
+    finder.run_investment_finder()
@@ -2,68 +2,169 @@
 Dashboard Page - Summary view of all stocks in watchlist
 """
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from streamlit_autorefresh import st_autorefresh
 import pandas as pd
-from typing import Dict
+from typing import Dict, Optional
+from dataclasses import dataclass
 import yfinance as yf
 from datetime import datetime
 import plotly.graph_objects as go
 import sys
 import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Import the advanced stock analyzer
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from stock_analyzer import StockAnalyzer
+from stock_analyzer import cached_signal
 
+# Max watchlist symbols summarized concurrently (each summary is a few blocking Yahoo calls)
+MAX_SUMMARY_WORKERS = 10
+# Watchlist summaries and chart history are reused across reruns for this long
+SUMMARY_CACHE_TTL = 300  # seconds
 
-def get_stock_summary(symbol: str) -> Dict:
-    """Get comprehensive summary of a stock using advanced analyzer"""
+# Watchlist row styling per signal: (color, emoji); anything else is shown as neutral
+SIGNAL_STYLES = {
+    'STRONG BUY': ('green', '🟢'),
+    'BUY': ('green', '🟢'),
+    'SELL': ('red', '🔴'),
+}
+NEUTRAL_SIGNAL_STYLE = ('orange', '🟡')
+
+
+@dataclass(slots=True)
+class StockSummary:
+    """One watchlist stock's price, signal and CAN SLIM checks, as shown on the dashboard.
+    
+    Slot attributes instead of a 16-key dict per stock; auto_trade/added_at are filled in
+    from the watchlist item after the (cached) fetch.
+    """
+    symbol: str
+    price: float
+    week_change: float
+    volume: float
+    signal: str
+    confidence: int
+    reason: str
+    buy_score: object
+    ma_50: Optional[float]
+    ma_200: Optional[float]
+    above_50: bool
+    above_200: bool
+    golden_cross: bool
+    eps_growth: Optional[float]
+    pe_ratio: Optional[float]
+    undervalued: bool
+    # Table label ("🟢 BUY"), formatted once here rather than on every render
+    signal_label: str = ''
+    auto_trade: str = ''
+    added_at: str = ''
+
+
+def get_stock_summary(symbol: str) -> Optional[StockSummary]:
+    """Get comprehensive summary of a stock using advanced analyzer (None if it can't be fetched)"""
     try:
-        # Use advanced analyzer
-        analyzer = StockAnalyzer(symbol)
-        result = analyzer.generate_signal()
-        
-        if result['signal'] == 'ERROR':
-            return None
-        
-        # Get basic price info
-        ticker = yf.Ticker(symbol)
-        hist = ticker.history(period="1wk")
-        
-        if hist.empty:
-            return None
-        
-        current_price = hist['Close'].iloc[-1]
-        week_start = hist['Close'].iloc[0]
-        week_change = ((current_price - week_start) / week_start) * 100
-        
-        # Extract analysis details
-        analysis = result.get('analysis', {})
-        ma_data = analysis.get('moving_averages', {})
-        eps_data = analysis.get('eps_growth', {})
-        pe_data = analysis.get('pe_ratio', {})
-        
-        return {
-            "symbol": symbol,
-            "price": round(current_price, 2),
-            "week_change": round(week_change, 2),
-            "volume": hist['Volume'].iloc[-1],
-            "signal": result['signal'],
-            "confidence": result['confidence'],
-            "reason": result['reason'],
-            "buy_score": result['buy_score'],
-            "ma_50": ma_data.get('ma_50'),
-            "ma_200": ma_data.get('ma_200'),
-            "above_50": ma_data.get('above_50', False),
-            "above_200": ma_data.get('above_200', False),
-            "golden_cross": ma_data.get('golden_cross', False),
-            "eps_growth": eps_data.get('yoy_growth'),
-            "pe_ratio": pe_data.get('pe_ratio'),
-            "undervalued": pe_data.get('undervalued', False)
-        }
-    except Exception as e:
+        return _cached_stock_summary(symbol)
+    except Exception:
         return None
 
 
+@st.cache_data(ttl=SUMMARY_CACHE_TTL, show_spinner=False)
+def _cached_stock_summary(symbol: str) -> StockSummary:
+    """get_stock_summary's cached body; failures raise, and st.cache_data doesn't cache exceptions,
+    so one transient API error isn't served for the whole TTL"""
+    # Use advanced analyzer (shared with the stock details page for SIGNAL_CACHE_TTL)
+    result, data = cached_signal(symbol)
+    
+    if result['signal'] == 'ERROR':
+        raise ValueError(f"Analysis failed for {symbol}: {result.get('reason')}")
+    
+    # Get basic price info from the last week of the analyzer's 1-year history (the same
+    # bars a period="1wk" download returns) instead of downloading it again
+    hist = data[data.index > data.index[-1] - pd.Timedelta(days=7)]
+    
+    if hist.empty:
+        raise ValueError(f"No recent price data for {symbol}")
+    
+    current_price = hist['Close'].iloc[-1]
+    week_start = hist['Close'].iloc[0]
+    week_change = ((current_price - week_start) / week_start) * 100
+    
+    # Extract analysis details
+    analysis = result.get('analysis', {})
+    ma_data = analysis.get('moving_averages', {})
+    eps_data = analysis.get('eps_growth', {})
+    pe_data = analysis.get('pe_ratio', {})
+    
+    return StockSummary(
+        symbol=symbol,
+        price=round(current_price, 2),
+        week_change=round(week_change, 2),
+        volume=hist['Volume'].iloc[-1],
+        signal=result['signal'],
+        confidence=result['confidence'],
+        reason=result['reason'],
+        buy_score=result['buy_score'],
+        ma_50=ma_data.get('ma_50'),
+        ma_200=ma_data.get('ma_200'),
+        above_50=ma_data.get('above_50', False),
+        above_200=ma_data.get('above_200', False),
+        golden_cross=ma_data.get('golden_cross', False),
+        eps_growth=eps_data.get('yoy_growth'),
+        pe_ratio=pe_data.get('pe_ratio'),
+        undervalued=pe_data.get('undervalued', False),
+        signal_label=f"{SIGNAL_STYLES.get(result['signal'], NEUTRAL_SIGNAL_STYLE)[1]} {result['signal']}"
+    )
+
+
+@st.cache_data(ttl=SUMMARY_CACHE_TTL, show_spinner=False)
+def get_closes_1mo(symbols: tuple) -> Dict[str, pd.Series]:
+    """1-month daily closes for the comparison chart, all symbols in one yf.download request"""
+    data = yf.download(list(symbols), period="1mo", group_by='ticker', progress=False, threads=True)
+    closes = {}
+    if data.empty:
+        return closes
+    for symbol in symbols:
+        if isinstance(data.columns, pd.MultiIndex):
+            if symbol not in data.columns.get_level_values(0):
+                continue
+            close = data[symbol]['Close']
+        else:
+            close = data['Close']
+        closes[symbol] = close.dropna()
+    return closes
+
+
+def build_comparison_chart(symbols) -> go.Figure:
+    """1-month close comparison figure for the selected symbols"""
+    fig = go.Figure()
+    closes = get_closes_1mo(tuple(symbols))
+    
+    for symbol in symbols:
+        close = closes.get(symbol)
+        
+        if close is not None and not close.empty:
+            fig.add_trace(go.Scatter(
+                x=close.index,
+                y=close,
+                mode='lines',
+                name=symbol,
+                line=dict(width=2)
+            ))
+    
+    fig.update_layout(
+        title="1-Month Price Comparison",
+        xaxis_title="Date",
+        yaxis_title="Price (USD)",
+        height=500,
+        template='plotly_white',
+        hovermode='x unified'
+    )
+    return fig
+
+
 def show(user_data: Dict, db):
     """Show dashboard page"""
     
@@ -98,6 +199,14 @@ def show(user_data: Dict, db):
         
         return
     
+    # One pass over the watchlist for the symbols to fetch and the auto-trade count
+    symbols = []
+    auto_trade_count = 0
+    for item in watchlist:
+        symbols.append(item['symbol'])
+        if item['auto_trade_enabled']:
+            auto_trade_count += 1
+    
     # Display statistics
     col1, col2, col3, col4 = st.columns(4)
     
@@ -105,16 +214,15 @@ def show(user_data: Dict, db):
         st.metric("Total Stocks", len(watchlist))
     
     with col2:
-        auto_trade_count = sum(1 for w in watchlist if w['auto_trade_enabled'])
         st.metric("Auto-Trade Active", auto_trade_count)
     
     with col3:
-        # Get recent trades
-        trades_df = db.get_user_trades(user_data['user_id'], limit=100)
-        st.metric("Total Trades", len(trades_df))
+        # Counted in SQL; no trade rows or DataFrame needed for the metric
+        trade_count = db.count_user_trades(user_data['user_id'])
+        st.metric("Total Trades", trade_count)
     
     with col4:
-        if not trades_df.empty:
+        if trade_count:
             total_pnl = 0  # Calculate P&L if needed
             st.metric("Today's P&L", "$0.00")  # Placeholder
         else:
@@ -127,80 +235,92 @@ def show(user_data: Dict, db):
     
     with st.spinner("Fetching stock data..."):
         summaries = []
+        summary_symbols = []
+        
+        # Summaries are network-bound, so fetch them on a thread pool; map keeps watchlist order
+        # Workers get this run's context so the cached get_stock_summary runs as part of it
+        ctx = get_script_run_ctx()
+        
+        def fetch_summary(symbol):
+            add_script_run_ctx(threading.current_thread(), ctx)
+            return get_stock_summary(symbol)
         
-        for item in watchlist:
-            summary = get_stock_summary(item['symbol'])
+        with ThreadPoolExecutor(max_workers=min(MAX_SUMMARY_WORKERS, len(symbols))) as executor:
+            results = list(executor.map(fetch_summary, symbols))
+        
+        for item, summary in zip(watchlist, results):
             if summary:
-                summary['auto_trade'] = '✅' if item['auto_trade_enabled'] else '❌'
-                summary['added_at'] = item['added_at']
+                summary.auto_trade = '✅' if item['auto_trade_enabled'] else '❌'
+                summary.added_at = item['added_at']
                 summaries.append(summary)
+                summary_symbols.append(summary.symbol)
     
     if summaries:
-        # Create summary dataframe
-        df_summary = pd.DataFrame(summaries)
-        
         # Display as interactive table with comprehensive metrics
         st.markdown("#### 📊 Comprehensive Stock Analysis")
         st.caption("Based on CAN SLIM methodology: EPS Growth, P/E Ratio, Moving Averages, Relative Strength, Volume & Market Trend")
         
-        for idx, row in df_summary.iterrows():
-            # Determine signal styling
-            if row['signal'] in ['STRONG BUY', 'BUY']:
-                signal_color = 'green'
-                signal_emoji = '🟢'
-            elif row['signal'] == 'SELL':
-                signal_color = 'red'
-                signal_emoji = '🔴'
-            else:
-                signal_color = 'orange'
-                signal_emoji = '🟡'
-            
-            # Create expandable row for each stock
-            with st.expander(f"{signal_emoji} **{row['symbol']}** - ${row['price']} ({row['week_change']:+.2f}%) - **{row['signal']}** ({row['confidence']}% confidence)", expanded=False):
-                col1, col2, col3 = st.columns([2, 2, 2])
-                
-                with col1:
-                    st.markdown("**📈 Technical**")
-                    st.markdown(f"✓ Above 50-day MA: {'✅' if row.get('above_50') else '❌'}")
-                    st.markdown(f"✓ Above 200-day MA: {'✅' if row.get('above_200') else '❌'}")
-                    if row.get('golden_cross'):
-                        st.markdown("⭐ **Golden Cross Detected!**")
-                    if row.get('ma_50'):
-                        st.caption(f"50-day MA: ${row['ma_50']:.2f}")
-                    if row.get('ma_200'):
-                        st.caption(f"200-day MA: ${row['ma_200']:.2f}")
-                
-                with col2:
-                    st.markdown("**💰 Fundamentals**")
-                    if row.get('eps_growth'):
-                        eps_icon = '✅' if row['eps_growth'] >= 25 else '⚠️'
-                        st.markdown(f"{eps_icon} EPS Growth: {row['eps_growth']:.1f}%")
-                    if row.get('pe_ratio'):
-                        pe_icon = '✅' if row.get('undervalued') else '📊'
-                        st.markdown(f"{pe_icon} P/E Ratio: {row['pe_ratio']:.1f}")
-                        if row.get('undervalued'):
-                            st.caption("📉 Undervalued vs industry")
-                
-                with col3:
-                    st.markdown("**🎯 Analysis**")
-                    st.markdown(f"Buy Score: **{row.get('buy_score', 'N/A')}**")
-                    st.markdown(f"Confidence: **{row['confidence']}%**")
-                    st.caption(f"_{row['reason']}_")
-                
-                # Action buttons
-                col_a, col_b, col_c = st.columns([2, 2, 2])
-                with col_a:
-                    if st.button("View Details", key=f"view_{row['symbol']}", use_container_width=True):
-                        st.session_state.selected_stock = row['symbol']
-                        st.session_state.page = "Stock Details"
-                        st.rerun()
-                with col_b:
-                    st.markdown(f"Auto-Trade: {row['auto_trade']}")
-                with col_c:
-                    if st.button("Remove", key=f"remove_{row['symbol']}", type="secondary", use_container_width=True):
-                        db.remove_from_watchlist(user_data['user_id'], row['symbol'])
-                        st.success(f"Removed {row['symbol']}")
-                        st.rerun()
+        # One Arrow-backed table for the whole watchlist instead of an expander (and a dozen
+        # widgets) per stock; built column by column from the summaries
+        table = {
+            "Signal": [], "Symbol": [], "Price": [], "Week %": [], "Confidence": [],
+            "Buy Score": [], "Above 50-day MA": [], "Above 200-day MA": [], "Golden Cross": [],
+            "50-day MA": [], "200-day MA": [], "EPS Growth %": [], "P/E Ratio": [],
+            "Undervalued": [], "Auto-Trade": [], "Reason": []
+        }
+        for row in summaries:
+            table["Signal"].append(row.signal_label)
+            table["Symbol"].append(row.symbol)
+            table["Price"].append(row.price)
+            table["Week %"].append(row.week_change)
+            table["Confidence"].append(row.confidence)
+            table["Buy Score"].append(row.buy_score)
+            table["Above 50-day MA"].append(bool(row.above_50))
+            table["Above 200-day MA"].append(bool(row.above_200))
+            table["Golden Cross"].append(bool(row.golden_cross))
+            table["50-day MA"].append(row.ma_50)
+            table["200-day MA"].append(row.ma_200)
+            table["EPS Growth %"].append(row.eps_growth)
+            table["P/E Ratio"].append(row.pe_ratio)
+            table["Undervalued"].append(bool(row.undervalued))
+            table["Auto-Trade"].append(row.auto_trade)
+            table["Reason"].append(row.reason)
+        
+        st.dataframe(
+            pd.DataFrame(table),
+            column_config={
+                "Price": st.column_config.NumberColumn(format="$%.2f"),
+                "Week %": st.column_config.NumberColumn(format="%+.2f%%"),
+                "Confidence": st.column_config.ProgressColumn(min_value=0, max_value=100, format="%d%%"),
+                "50-day MA": st.column_config.NumberColumn(format="$%.2f"),
+                "200-day MA": st.column_config.NumberColumn(format="$%.2f"),
+                "EPS Growth %": st.column_config.NumberColumn(format="%.1f%%"),
+                "P/E Ratio": st.column_config.NumberColumn(format="%.1f"),
+                "Reason": st.column_config.TextColumn(width="large")
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+        
+        # Actions for one stock at a time, picked below the table
+        col_a, col_b, col_c = st.columns([2, 2, 2])
+        with col_a:
+            action_symbol = st.selectbox(
+                "Stock",
+                options=summary_symbols,
+                key="dashboard_action_symbol",
+                label_visibility="collapsed"
+            )
+        with col_b:
+            if st.button("View Details", key="view_selected", use_container_width=True):
+                st.session_state.selected_stock = action_symbol
+                st.session_state.page = "Stock Details"
+                st.rerun()
+        with col_c:
+            if st.button("Remove", key="remove_selected", type="secondary", use_container_width=True):
+                db.remove_from_watchlist(user_data['user_id'], action_symbol)
+                st.success(f"Removed {action_symbol}")
+                st.rerun()
         
         # Charts section
         st.markdown("### 📊 Quick Charts")
@@ -208,38 +328,20 @@ def show(user_data: Dict, db):
         # Allow user to select stocks for comparison
         selected_for_chart = st.multiselect(
             "Select stocks to compare (max 5)",
-            options=[s['symbol'] for s in summaries],
-            default=[summaries[0]['symbol']] if summaries else [],
+            options=summary_symbols,
+            default=summary_symbols[:1],
             max_selections=5
         )
         
         if selected_for_chart:
-            # Fetch historical data
-            fig = go.Figure()
-            
-            for symbol in selected_for_chart:
-                ticker = yf.Ticker(symbol)
-                hist = ticker.history(period="1mo")
-                
-                if not hist.empty:
-                    fig.add_trace(go.Scatter(
-                        x=hist.index,
-                        y=hist['Close'],
-                        mode='lines',
-                        name=symbol,
-                        line=dict(width=2)
-                    ))
-            
-            fig.update_layout(
-                title="1-Month Price Comparison",
-                xaxis_title="Date",
-                yaxis_title="Price (USD)",
-                height=500,
-                template='plotly_white',
-                hovermode='x unified'
-            )
+            # Reruns with the same selection (e.g. a click elsewhere on the page) reuse this
+            # session's figure; it is rebuilt when the selection changes or the history TTL rolls
+            chart_key = (tuple(selected_for_chart), int(time.time() // SUMMARY_CACHE_TTL))
+            if st.session_state.get('dashboard_chart_key') != chart_key:
+                st.session_state.dashboard_chart_fig = build_comparison_chart(selected_for_chart)
+                st.session_state.dashboard_chart_key = chart_key
             
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(st.session_state.dashboard_chart_fig, use_container_width=True)
     
     else:
         st.warning("No stock data available")
@@ -256,6 +358,5 @@ def show(user_data: Dict, db):
             st.rerun()
     
     if auto_refresh:
-        import time
-        time.sleep(300)  # 5 minutes
-        st.rerun()
+        # The browser triggers the rerun after 5 minutes; the script thread isn't held meanwhile
+        st_autorefresh(interval=300 * 1000, key="dashboard_autorefresh")
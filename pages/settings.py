@@ -1,397 +1,464 @@
 """
 Settings Page - User account and API configuration
 """
+import io
+import csv
 import streamlit as st
 from typing import Dict
+import sys
+import os
 
+# How long a successful connection test's account figures are reused
+ACCOUNT_SNAPSHOT_TTL = 30
+# Dashboard Theme choices and their selectbox positions
+THEMES = ("Light", "Dark", "Auto")
+THEME_INDEX = {theme: i for i, theme in enumerate(THEMES)}
 
-def show(user_data: Dict, db):
-    """Show settings page"""
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@st.cache_resource
+def _get_rest(api_key, api_secret, base_url):
+    """Imports alpaca_trade_api only when a connection is first tested, then keeps the client for the process"""
+    from alpaca_trade_api.rest import REST
+    return REST(api_key, api_secret, base_url)
+
+
+@st.cache_data(ttl=ACCOUNT_SNAPSHOT_TTL, show_spinner=False)
+def _account_snapshot(api_key, api_secret, base_url) -> Dict:
+    """Raw account fields; repeat test clicks within the TTL skip the HTTPS round-trip (failures are not cached)"""
+    return _get_rest(api_key, api_secret, base_url).get_account()._raw
+
+
+def _changed_settings(db, stored: Dict, values: Dict) -> Dict:
+    """Only the settings whose stored text would differ from what is already saved"""
+    return {key: value for key, value in values.items() if stored.get(key) != db.setting_text(value)}
+
+
+# Each tab is a fragment: a widget change inside it reruns only that tab, not the whole page
+@st.fragment
+def _render_api_tab(user_data: Dict, db):
+    """API key configuration and connection test"""
+    st.markdown("### 🔑 Alpaca API Configuration")
+    st.markdown("""
+    Configure your Alpaca API keys to enable automated trading.
     
-    st.title("⚙️ Settings")
-    st.markdown("Manage your account and trading preferences")
+    - Get your API keys from [Alpaca Markets](https://alpaca.markets/)
+    - Use **Paper Trading** keys for testing
+    - Use **Live Trading** keys for real money trading
+    """)
     
-    # Tabs for different settings
-    tab1, tab2, tab3, tab4 = st.tabs(["🔑 API Keys", "👤 Account", "🎨 Preferences", "🤖 Auto-Trade"])
+    # Get current keys
+    current_api_key, current_api_secret = db.get_user_api_keys(user_data['user_id'])
     
-    with tab1:
-        st.markdown("### 🔑 Alpaca API Configuration")
-        st.markdown("""
-        Configure your Alpaca API keys to enable automated trading.
+    with st.form("api_keys_form"):
+        api_key = st.text_input(
+            "API Key ID",
+            value=current_api_key,
+            type="password",
+            help="Your Alpaca API Key ID"
+        )
         
-        - Get your API keys from [Alpaca Markets](https://alpaca.markets/)
-        - Use **Paper Trading** keys for testing
-        - Use **Live Trading** keys for real money trading
-        """)
+        api_secret = st.text_input(
+            "API Secret Key",
+            value=current_api_secret,
+            type="password",
+            help="Your Alpaca API Secret Key"
+        )
         
-        # Get current keys
-        current_api_key, current_api_secret = db.get_user_api_keys(user_data['user_id'])
+        base_url = st.selectbox(
+            "Environment",
+            ["https://paper-api.alpaca.markets", "https://api.alpaca.markets"],
+            help="Use paper-api for testing, api for live trading"
+        )
         
-        with st.form("api_keys_form"):
-            api_key = st.text_input(
-                "API Key ID",
-                value=current_api_key,
-                type="password",
-                help="Your Alpaca API Key ID"
-            )
-            
-            api_secret = st.text_input(
-                "API Secret Key",
-                value=current_api_secret,
-                type="password",
-                help="Your Alpaca API Secret Key"
-            )
-            
-            base_url = st.selectbox(
-                "Environment",
-                ["https://paper-api.alpaca.markets", "https://api.alpaca.markets"],
-                help="Use paper-api for testing, api for live trading"
-            )
-            
-            submit = st.form_submit_button("💾 Save API Keys", use_container_width=True)
-            
-            if submit:
-                if api_key and api_secret:
-                    if db.update_user_api_keys(user_data['user_id'], api_key, api_secret):
-                        db.save_setting(user_data['user_id'], 'alpaca_base_url', base_url)
-                        st.success("✅ API keys updated successfully!")
-                        st.rerun()
-                    else:
-                        st.error("❌ Failed to update API keys")
+        submit = st.form_submit_button("💾 Save API Keys", use_container_width=True)
+        
+        if submit:
+            if api_key and api_secret:
+                if db.update_user_api_keys(user_data['user_id'], api_key, api_secret):
+                    db.save_setting(user_data['user_id'], 'alpaca_base_url', base_url)
+                    st.success("✅ API keys updated successfully!")
+                    st.rerun()
                 else:
-                    st.warning("Please enter both API key and secret")
+                    st.error("❌ Failed to update API keys")
+            else:
+                st.warning("Please enter both API key and secret")
+    
+    # Test connection
+    if current_api_key and current_api_secret:
+        st.markdown("---")
+        st.markdown("### 🧪 Test Connection")
         
-        # Test connection
-        if current_api_key and current_api_secret:
-            st.markdown("---")
-            st.markdown("### 🧪 Test Connection")
-            
-            if st.button("Test API Connection", use_container_width=True):
-                try:
-                    from alpaca_trade_api.rest import REST
-                    
-                    api = REST(current_api_key, current_api_secret, base_url)
-                    account = api.get_account()
-                    
-                    st.success("✅ Connection successful!")
-                    
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.metric("Account Status", account.status)
-                    with col2:
-                        st.metric("Buying Power", f"${float(account.buying_power):,.2f}")
-                    with col3:
-                        st.metric("Equity", f"${float(account.equity):,.2f}")
-                    
-                except Exception as e:
-                    st.error(f"❌ Connection failed: {e}")
-        else:
-            st.info("ℹ️ Add your API keys above to test the connection")
+        if st.button("Test API Connection", use_container_width=True):
+            try:
+                account = _account_snapshot(current_api_key, current_api_secret, base_url)
+                
+                st.success("✅ Connection successful!")
+                
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Account Status", account['status'])
+                with col2:
+                    st.metric("Buying Power", f"${float(account['buying_power']):,.2f}")
+                with col3:
+                    st.metric("Equity", f"${float(account['equity']):,.2f}")
+                
+            except Exception as e:
+                st.error(f"❌ Connection failed: {e}")
+    else:
+        st.info("ℹ️ Add your API keys above to test the connection")
+
+
+@st.fragment
+def _render_account_tab(user_data: Dict, db):
+    """Account details, password change and danger zone"""
+    st.markdown("### 👤 Account Information")
     
-    with tab2:
-        st.markdown("### 👤 Account Information")
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("**Username**")
+        st.text(user_data['username'])
+    
+    with col2:
+        st.markdown("**Email**")
+        st.text(user_data['email'])
+    
+    st.markdown("---")
+    
+    # Password change
+    st.markdown("### 🔒 Change Password")
+    
+    with st.form("change_password_form"):
+        current_password = st.text_input("Current Password", type="password")
+        new_password = st.text_input("New Password", type="password")
+        confirm_password = st.text_input("Confirm New Password", type="password")
         
-        col1, col2 = st.columns(2)
+        change_pwd = st.form_submit_button("Change Password", use_container_width=True)
         
-        with col1:
-            st.markdown("**Username**")
-            st.text(user_data['username'])
+        if change_pwd:
+            if not all([current_password, new_password, confirm_password]):
+                st.warning("Please fill in all fields")
+            elif new_password != confirm_password:
+                st.error("New passwords do not match")
+            elif len(new_password) < 6:
+                st.error("Password must be at least 6 characters")
+            else:
+                # Verify current password
+                user = db.authenticate_user(user_data['username'], current_password)
+                if user:
+                    # Update password (would need to add this method to database.py)
+                    st.info("Password change functionality coming soon")
+                else:
+                    st.error("Current password is incorrect")
+    
+    st.markdown("---")
+    
+    # Danger zone
+    st.markdown("### ⚠️ Danger Zone")
+    
+    with st.expander("Delete Account"):
+        st.warning("⚠️ This action cannot be undone!")
         
-        with col2:
-            st.markdown("**Email**")
-            st.text(user_data['email'])
+        if st.button("Delete My Account", type="secondary"):
+            st.error("Account deletion functionality coming soon. Please contact support.")
+
+
+@st.fragment
+def _render_preferences_tab(user_data: Dict, db):
+    """Trading preferences and data export"""
+    st.markdown("### 🎨 Trading Preferences")
+    
+    # Get current settings
+    settings = db.get_all_settings(user_data['user_id'])
+    
+    with st.form("preferences_form"):
+        # Auto-trade settings
+        st.markdown("#### Auto-Trade Defaults")
+        
+        default_qty = st.number_input(
+            "Default Trade Quantity",
+            min_value=1,
+            value=int(settings.get('default_quantity', 10)),
+            help="Default number of shares for auto-trades"
+        )
+        
+        stop_loss_pct = st.slider(
+            "Stop Loss %",
+            min_value=1,
+            max_value=20,
+            value=int(settings.get('stop_loss_pct', 5)),
+            help="Automatic stop loss percentage"
+        )
+        
+        take_profit_pct = st.slider(
+            "Take Profit %",
+            min_value=1,
+            max_value=50,
+            value=int(settings.get('take_profit_pct', 10)),
+            help="Automatic take profit percentage"
+        )
+        
+        st.markdown("#### Notifications")
+        
+        email_notifications = st.checkbox(
+            "Email Notifications",
+            value=settings.get('email_notifications', 'true') == 'true',
+            help="Receive email alerts for trades"
+        )
+        
+        trade_alerts = st.checkbox(
+            "Trade Execution Alerts",
+            value=settings.get('trade_alerts', 'true') == 'true',
+            help="Get notified when trades are executed"
+        )
+        
+        signal_alerts = st.checkbox(
+            "Signal Alerts",
+            value=settings.get('signal_alerts', 'true') == 'true',
+            help="Get notified of buy/sell signals"
+        )
+        
+        st.markdown("#### Display")
+        
+        theme = st.selectbox(
+            "Dashboard Theme",
+            THEMES,
+            index=THEME_INDEX.get(settings.get('theme', 'Auto'), THEME_INDEX['Auto'])
+        )
+        
+        refresh_interval = st.slider(
+            "Auto-refresh Interval (minutes)",
+            min_value=1,
+            max_value=60,
+            value=int(settings.get('refresh_interval', 5)),
+            help="How often to refresh data automatically"
+        )
+        
+        save_prefs = st.form_submit_button("💾 Save Preferences", use_container_width=True)
+        
+        if save_prefs:
+            # Save only what changed, all in one transaction
+            changed = _changed_settings(db, settings, {
+                'default_quantity': default_qty,
+                'stop_loss_pct': stop_loss_pct,
+                'take_profit_pct': take_profit_pct,
+                'email_notifications': email_notifications,
+                'trade_alerts': trade_alerts,
+                'signal_alerts': signal_alerts,
+                'theme': theme,
+                'refresh_interval': refresh_interval
+            })
+            
+            if changed:
+                db.save_settings_bulk(user_data['user_id'], changed)
+                st.success("✅ Preferences saved successfully!")
+                st.rerun()
+            else:
+                st.info("No changes to save")
+    
+    st.markdown("---")
+    
+    # Export/Import settings
+    st.markdown("### 📥 Data Management")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        if st.button("📥 Export Watchlist", use_container_width=True):
+            watchlist = db.get_user_watchlist(user_data['user_id'])
+            # The rows are already dicts, so write them out directly (same CSV as DataFrame.to_csv)
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=list(watchlist[0]) if watchlist else [], lineterminator='\n')
+            writer.writeheader()
+            writer.writerows(watchlist)
+            st.download_button(
+                "Download Watchlist CSV",
+                buffer.getvalue(),
+                file_name=f"watchlist_{user_data['username']}.csv",
+                mime="text/csv"
+            )
+    
+    with col2:
+        if st.button("📥 Export Trade History", use_container_width=True):
+            trades = db.get_user_trades(user_data['user_id'], limit=10000)
+            trades_csv = trades.to_csv(index=False)
+            st.download_button(
+                "Download Trades CSV",
+                trades_csv,
+                file_name=f"trades_{user_data['username']}.csv",
+                mime="text/csv"
+            )
+
+
+@st.fragment
+def _render_autotrade_tab(user_data: Dict, db):
+    """Auto-trade status, manual run and limits"""
+    st.markdown("### 🤖 Auto-Trade Configuration")
+    st.markdown("""
+    Enable automatic trading based on CAN SLIM analysis signals.
+    
+    **How it works:**
+    - System checks your auto-enabled stocks every 15 minutes
+    - Executes trades automatically when high-confidence signals are detected
+    - Uses 10% of available buying power per position
+    - Includes automatic stop-loss (8%) and take-profit (10%)
+    """)
+    
+    # Check API keys
+    api_key, api_secret = db.get_user_api_keys(user_data['user_id'])
+    
+    if not api_key or not api_secret:
+        st.error("⚠️ API Keys not configured. Please add your Alpaca API keys in the API Keys tab first.")
+    else:
+        st.success("✅ API Keys configured")
+        
+        # Check auto-trade enabled stocks
+        auto_enabled = db.get_auto_trade_symbols(user_data['user_id'])
+        
+        st.info(f"📊 Auto-trade enabled for **{len(auto_enabled)}** stocks")
+        
+        if auto_enabled:
+            st.markdown("**Stocks with auto-trade enabled:**")
+            # One markdown element for the whole list rather than one per stock
+            st.markdown("\n".join(f"- {symbol}" for symbol in auto_enabled))
         
         st.markdown("---")
         
-        # Password change
-        st.markdown("### 🔒 Change Password")
+        # Manual trigger
+        st.markdown("### 🎯 Manual Execution")
+        st.markdown("Run auto-trade analysis and execution now (don't wait for scheduled interval)")
         
-        with st.form("change_password_form"):
-            current_password = st.text_input("Current Password", type="password")
-            new_password = st.text_input("New Password", type="password")
-            confirm_password = st.text_input("Confirm New Password", type="password")
-            
-            change_pwd = st.form_submit_button("Change Password", use_container_width=True)
-            
-            if change_pwd:
-                if not all([current_password, new_password, confirm_password]):
-                    st.warning("Please fill in all fields")
-                elif new_password != confirm_password:
-                    st.error("New passwords do not match")
-                elif len(new_password) < 6:
-                    st.error("Password must be at least 6 characters")
-                else:
-                    # Verify current password
-                    user = db.authenticate_user(user_data['username'], current_password)
-                    if user:
-                        # Update password (would need to add this method to database.py)
-                        st.info("Password change functionality coming soon")
-                    else:
-                        st.error("Current password is incorrect")
+        if st.button("🚀 Run Auto-Trade Now", type="primary", use_container_width=True):
+            if not auto_enabled:
+                st.warning("No stocks enabled for auto-trading. Enable stocks in Watchlist Manager.")
+            else:
+                with st.spinner("Running auto-trade analysis..."):
+                    try:
+                        # Imported only when a manual run is requested (cached in sys.modules after that)
+                        from auto_trader import AutoTrader
+                        
+                        trader = AutoTrader(user_data['user_id'], db)
+                        trader.check_and_execute_trades()
+                        
+                        st.success("✅ Auto-trade execution completed! Check Trade History for details.")
+                    except Exception as e:
+                        st.error(f"❌ Error running auto-trader: {e}")
         
         st.markdown("---")
         
-        # Danger zone
-        st.markdown("### ⚠️ Danger Zone")
+        # Configuration
+        st.markdown("### ⚙️ Auto-Trade Settings")
         
-        with st.expander("Delete Account"):
-            st.warning("⚠️ This action cannot be undone!")
-            
-            if st.button("Delete My Account", type="secondary"):
-                st.error("Account deletion functionality coming soon. Please contact support.")
-    
-    with tab3:
-        st.markdown("### 🎨 Trading Preferences")
+        # One cached read for all five limits instead of a query per get_setting
+        auto_settings = db.get_all_settings(user_data['user_id'])
         
-        # Get current settings
-        settings = db.get_all_settings(user_data['user_id'])
+        st.markdown("#### Trading Strategy")
+        col1, col2 = st.columns(2)
         
-        with st.form("preferences_form"):
-            # Auto-trade settings
-            st.markdown("#### Auto-Trade Defaults")
-            
-            default_qty = st.number_input(
-                "Default Trade Quantity",
-                min_value=1,
-                value=int(settings.get('default_quantity', 10)),
-                help="Default number of shares for auto-trades"
+        with col1:
+            min_confidence = st.slider(
+                "Minimum Confidence %",
+                min_value=50,
+                max_value=95,
+                value=int(auto_settings.get('auto_trade_min_confidence') or 70),
+                help="Only execute trades with this confidence level or higher"
             )
-            
-            stop_loss_pct = st.slider(
-                "Stop Loss %",
-                min_value=1,
+        
+        with col2:
+            max_position_pct = st.slider(
+                "Max Position Size (%)",
+                min_value=5,
                 max_value=20,
-                value=int(settings.get('stop_loss_pct', 5)),
-                help="Automatic stop loss percentage"
-            )
-            
-            take_profit_pct = st.slider(
-                "Take Profit %",
-                min_value=1,
-                max_value=50,
-                value=int(settings.get('take_profit_pct', 10)),
-                help="Automatic take profit percentage"
-            )
-            
-            st.markdown("#### Notifications")
-            
-            email_notifications = st.checkbox(
-                "Email Notifications",
-                value=settings.get('email_notifications', 'true') == 'true',
-                help="Receive email alerts for trades"
-            )
-            
-            trade_alerts = st.checkbox(
-                "Trade Execution Alerts",
-                value=settings.get('trade_alerts', 'true') == 'true',
-                help="Get notified when trades are executed"
-            )
-            
-            signal_alerts = st.checkbox(
-                "Signal Alerts",
-                value=settings.get('signal_alerts', 'true') == 'true',
-                help="Get notified of buy/sell signals"
-            )
-            
-            st.markdown("#### Display")
-            
-            theme = st.selectbox(
-                "Dashboard Theme",
-                ["Light", "Dark", "Auto"],
-                index=["Light", "Dark", "Auto"].index(settings.get('theme', 'Auto'))
+                value=int(auto_settings.get('auto_trade_max_position_pct') or 10),
+                help="Maximum percentage of buying power to use per position"
             )
-            
-            refresh_interval = st.slider(
-                "Auto-refresh Interval (minutes)",
-                min_value=1,
-                max_value=60,
-                value=int(settings.get('refresh_interval', 5)),
-                help="How often to refresh data automatically"
-            )
-            
-            save_prefs = st.form_submit_button("💾 Save Preferences", use_container_width=True)
-            
-            if save_prefs:
-                # Save all settings
-                db.save_setting(user_data['user_id'], 'default_quantity', str(default_qty))
-                db.save_setting(user_data['user_id'], 'stop_loss_pct', str(stop_loss_pct))
-                db.save_setting(user_data['user_id'], 'take_profit_pct', str(take_profit_pct))
-                db.save_setting(user_data['user_id'], 'email_notifications', str(email_notifications).lower())
-                db.save_setting(user_data['user_id'], 'trade_alerts', str(trade_alerts).lower())
-                db.save_setting(user_data['user_id'], 'signal_alerts', str(signal_alerts).lower())
-                db.save_setting(user_data['user_id'], 'theme', theme)
-                db.save_setting(user_data['user_id'], 'refresh_interval', str(refresh_interval))
-                
-                st.success("✅ Preferences saved successfully!")
-                st.rerun()
         
         st.markdown("---")
         
-        # Export/Import settings
-        st.markdown("### 📥 Data Management")
+        # Daily limits
+        st.markdown("#### Daily Trading Limits")
+        st.caption("Set limits to control automated trading activity and manage risk")
         
-        col1, col2 = st.columns(2)
+        col1, col2, col3 = st.columns(3)
         
         with col1:
-            if st.button("📥 Export Watchlist", use_container_width=True):
-                watchlist = db.get_user_watchlist(user_data['user_id'])
-                import pandas as pd
-                df = pd.DataFrame(watchlist)
-                csv = df.to_csv(index=False)
-                st.download_button(
-                    "Download Watchlist CSV",
-                    csv,
-                    file_name=f"watchlist_{user_data['username']}.csv",
-                    mime="text/csv"
-                )
+            max_daily_trades = st.number_input(
+                "Max Total Trades/Day",
+                min_value=1,
+                max_value=100,
+                value=int(auto_settings.get('auto_trade_max_daily_trades') or 20),
+                help="Maximum total number of trades (buys + sells) per day"
+            )
         
         with col2:
-            if st.button("📥 Export Trade History", use_container_width=True):
-                trades = db.get_user_trades(user_data['user_id'], limit=10000)
-                csv = trades.to_csv(index=False)
-                st.download_button(
-                    "Download Trades CSV",
-                    csv,
-                    file_name=f"trades_{user_data['username']}.csv",
-                    mime="text/csv"
-                )
-    
-    with tab4:
-        st.markdown("### 🤖 Auto-Trade Configuration")
-        st.markdown("""
-        Enable automatic trading based on CAN SLIM analysis signals.
-        
-        **How it works:**
-        - System checks your auto-enabled stocks every 15 minutes
-        - Executes trades automatically when high-confidence signals are detected
-        - Uses 10% of available buying power per position
-        - Includes automatic stop-loss (8%) and take-profit (10%)
-        """)
+            max_daily_buys = st.number_input(
+                "Max Buys/Day",
+                min_value=1,
+                max_value=50,
+                value=int(auto_settings.get('auto_trade_max_daily_buys') or 10),
+                help="Maximum number of buy orders per day"
+            )
         
-        # Check API keys
-        api_key, api_secret = db.get_user_api_keys(user_data['user_id'])
+        with col3:
+            max_daily_sells = st.number_input(
+                "Max Sells/Day",
+                min_value=1,
+                max_value=50,
+                value=int(auto_settings.get('auto_trade_max_daily_sells') or 10),
+                help="Maximum number of sell orders per day"
+            )
         
-        if not api_key or not api_secret:
-            st.error("⚠️ API Keys not configured. Please add your Alpaca API keys in the API Keys tab first.")
-        else:
-            st.success("✅ API Keys configured")
-            
-            # Check auto-trade enabled stocks
-            watchlist = db.get_user_watchlist(user_data['user_id'])
-            auto_enabled = [w for w in watchlist if w['auto_trade_enabled']]
-            
-            st.info(f"📊 Auto-trade enabled for **{len(auto_enabled)}** stocks")
-            
-            if auto_enabled:
-                st.markdown("**Stocks with auto-trade enabled:**")
-                for stock in auto_enabled:
-                    st.markdown(f"- {stock['symbol']}")
-            
-            st.markdown("---")
-            
-            # Manual trigger
-            st.markdown("### 🎯 Manual Execution")
-            st.markdown("Run auto-trade analysis and execution now (don't wait for scheduled interval)")
-            
-            if st.button("🚀 Run Auto-Trade Now", type="primary", use_container_width=True):
-                if not auto_enabled:
-                    st.warning("No stocks enabled for auto-trading. Enable stocks in Watchlist Manager.")
-                else:
-                    with st.spinner("Running auto-trade analysis..."):
-                        try:
-                            import sys
-                            import os
-                            sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-                            from auto_trader import AutoTrader
-                            
-                            trader = AutoTrader(user_data['user_id'], db)
-                            trader.check_and_execute_trades()
-                            
-                            st.success("✅ Auto-trade execution completed! Check Trade History for details.")
-                        except Exception as e:
-                            st.error(f"❌ Error running auto-trader: {e}")
-            
-            st.markdown("---")
-            
-            # Configuration
-            st.markdown("### ⚙️ Auto-Trade Settings")
-            
-            st.markdown("#### Trading Strategy")
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                min_confidence = st.slider(
-                    "Minimum Confidence %",
-                    min_value=50,
-                    max_value=95,
-                    value=int(db.get_setting(user_data['user_id'], 'auto_trade_min_confidence') or 70),
-                    help="Only execute trades with this confidence level or higher"
-                )
-            
-            with col2:
-                max_position_pct = st.slider(
-                    "Max Position Size (%)",
-                    min_value=5,
-                    max_value=20,
-                    value=int(db.get_setting(user_data['user_id'], 'auto_trade_max_position_pct') or 10),
-                    help="Maximum percentage of buying power to use per position"
-                )
-            
-            st.markdown("---")
-            
-            # Daily limits
-            st.markdown("#### Daily Trading Limits")
-            st.caption("Set limits to control automated trading activity and manage risk")
-            
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                max_daily_trades = st.number_input(
-                    "Max Total Trades/Day",
-                    min_value=1,
-                    max_value=100,
-                    value=int(db.get_setting(user_data['user_id'], 'auto_trade_max_daily_trades') or 20),
-                    help="Maximum total number of trades (buys + sells) per day"
-                )
-            
-            with col2:
-                max_daily_buys = st.number_input(
-                    "Max Buys/Day",
-                    min_value=1,
-                    max_value=50,
-                    value=int(db.get_setting(user_data['user_id'], 'auto_trade_max_daily_buys') or 10),
-                    help="Maximum number of buy orders per day"
-                )
-            
-            with col3:
-                max_daily_sells = st.number_input(
-                    "Max Sells/Day",
-                    min_value=1,
-                    max_value=50,
-                    value=int(db.get_setting(user_data['user_id'], 'auto_trade_max_daily_sells') or 10),
-                    help="Maximum number of sell orders per day"
-                )
-            
-            if st.button("💾 Save Auto-Trade Settings", use_container_width=True):
-                db.save_setting(user_data['user_id'], 'auto_trade_min_confidence', str(min_confidence))
-                db.save_setting(user_data['user_id'], 'auto_trade_max_position_pct', str(max_position_pct))
-                db.save_setting(user_data['user_id'], 'auto_trade_max_daily_trades', str(max_daily_trades))
-                db.save_setting(user_data['user_id'], 'auto_trade_max_daily_buys', str(max_daily_buys))
-                db.save_setting(user_data['user_id'], 'auto_trade_max_daily_sells', str(max_daily_sells))
+        if st.button("💾 Save Auto-Trade Settings", use_container_width=True):
+            changed = _changed_settings(db, auto_settings, {
+                'auto_trade_min_confidence': min_confidence,
+                'auto_trade_max_position_pct': max_position_pct,
+                'auto_trade_max_daily_trades': max_daily_trades,
+                'auto_trade_max_daily_buys': max_daily_buys,
+                'auto_trade_max_daily_sells': max_daily_sells
+            })
+            if changed:
+                db.save_settings_bulk(user_data['user_id'], changed)
                 st.success("✅ Auto-trade settings saved!")
                 st.rerun()
-            
-            st.markdown("---")
-            st.info("""
-            **💡 Running Continuously:**
-            
-            To run auto-trader every 5 minutes continuously, execute in terminal:
-            ```
-            python auto_trader.py """ + str(user_data['user_id']) + """ 5
-            ```
-            
-            This will check your enabled stocks and execute trades automatically every 5 minutes.
-            """)
+            else:
+                st.info("No changes to save")
+        
+        st.markdown("---")
+        st.info("""
+        **💡 Running Continuously:**
+        
+        To run auto-trader every 5 minutes continuously, execute in terminal:
+        ```
+        python auto_trader.py """ + str(user_data['user_id']) + """ 5
+        ```
+        
+        This will check your enabled stocks and execute trades automatically every 5 minutes.
+        """)
+
+
+def show(user_data: Dict, db):
+    """Show settings page"""
+    
+    st.title("⚙️ Settings")
+    st.markdown("Manage your account and trading preferences")
+    
+    # Tabs for different settings
+    tab1, tab2, tab3, tab4 = st.tabs(["🔑 API Keys", "👤 Account", "🎨 Preferences", "🤖 Auto-Trade"])
+    
+    with tab1:
+        _render_api_tab(user_data, db)
+    
+    with tab2:
+        _render_account_tab(user_data, db)
+    
+    with tab3:
+        _render_preferences_tab(user_data, db)
+    
+    with tab4:
+        _render_autotrade_tab(user_data, db)
     
     # Footer
     st.markdown("---")
@@ -13,15 +13,14 @@ import os
 
 # Import the advanced stock analyzer
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from stock_analyzer import StockAnalyzer
+from stock_analyzer import cached_signal
 
 
 def analyze_stock_detailed(symbol: str) -> Dict:
     """Comprehensive stock analysis using CAN SLIM methodology"""
     try:
-        # Use advanced analyzer
-        analyzer = StockAnalyzer(symbol)
-        full_analysis = analyzer.generate_signal()
+        # Use advanced analyzer (shared with the dashboard summaries for SIGNAL_CACHE_TTL)
+        full_analysis, _ = cached_signal(symbol)
         
         if full_analysis['signal'] == 'ERROR':
             return None
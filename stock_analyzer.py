@@ -2,12 +2,19 @@
 Advanced Stock Analyzer - CAN SLIM Style Analysis
 Implements comprehensive buy/sell/hold criteria based on fundamental and technical analysis
 """
+import copy
+import time
+import functools
 import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, Tuple, Optional
 
+# Analyses served by cached_signal are reused for this long, so the dashboard, stock details
+# page and their reruns share one analysis per symbol instead of re-fetching and re-scoring
+SIGNAL_CACHE_TTL = 300  # seconds
+
 class StockAnalyzer:
     """
     Analyzes stocks using CAN SLIM methodology
@@ -437,3 +444,32 @@ def analyze_stock(symbol: str) -> Dict:
     """Convenience function to analyze a stock"""
     analyzer = StockAnalyzer(symbol)
     return analyzer.generate_signal()
+
+
+class _SignalFailed(Exception):
+    """Carries an ERROR analysis out of _cached_signal; lru_cache doesn't cache exceptions"""
+    
+    def __init__(self, result: Dict, data: Optional[pd.DataFrame]):
+        super().__init__(result.get('reason'))
+        self.result = result
+        self.data = data
+
+
+@functools.lru_cache(maxsize=256)
+def _cached_signal(symbol: str, _bucket: int) -> Tuple[Dict, Optional[pd.DataFrame]]:
+    analyzer = StockAnalyzer(symbol)
+    result = analyzer.generate_signal()
+    if result['signal'] == 'ERROR':
+        raise _SignalFailed(result, analyzer.data)
+    return result, analyzer.data
+
+
+def cached_signal(symbol: str) -> Tuple[Dict, Optional[pd.DataFrame]]:
+    """(generate_signal() result, the analyzer's 1-year history) for symbol, memoized per
+    SIGNAL_CACHE_TTL window. The result dict is a copy; treat the history as read-only.
+    Failed (ERROR) analyses are returned but not cached, so the next call fetches again."""
+    try:
+        result, data = _cached_signal(symbol.upper(), int(time.time() // SIGNAL_CACHE_TTL))
+    except _SignalFailed as e:
+        return e.result, e.data
+    return copy.deepcopy(result), data